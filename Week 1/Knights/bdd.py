@@ -0,0 +1,305 @@
+import json
+
+from logic import *
+
+
+class BDD():
+    """
+    Reduced ordered binary decision diagrams over a shared node table.
+
+    Nodes are integers. 0 and 1 are the FALSE and TRUE terminals; every
+    other node is a (level, low, high) triple stored once in a unique
+    table, so equivalent sub-diagrams are always the same node.
+    """
+
+    FALSE = 0
+    TRUE = 1
+
+    def __init__(self, order=None):
+
+        # Variable order: level i tests the i-th variable
+        self.order = []
+        self.levels = dict()
+
+        # Node table, with terminals placed below every variable
+        self.nodes = [(None, None, None), (None, None, None)]
+        self.unique = dict()
+
+        # Memoization of apply and negate results
+        self.cache = dict()
+
+        for name in order or []:
+            self.add_variable(name)
+
+    def add_variable(self, name):
+        """Appends a variable to the bottom of the order if it is new."""
+        if name not in self.levels:
+            self.levels[name] = len(self.order)
+            self.order.append(name)
+
+    def level(self, u):
+        """Returns the level of a node; terminals sit below all variables."""
+        if u <= 1:
+            return float("inf")
+        return self.nodes[u][0]
+
+    def mk(self, level, low, high):
+        """Returns the unique node testing `level` with the given children."""
+        if low == high:
+            return low
+        key = (level, low, high)
+        u = self.unique.get(key)
+        if u is None:
+            u = len(self.nodes)
+            self.nodes.append(key)
+            self.unique[key] = u
+        return u
+
+    def var(self, name):
+        """Returns the node for a single variable."""
+        self.add_variable(name)
+        return self.mk(self.levels[name], self.FALSE, self.TRUE)
+
+    def negate(self, u):
+        """Returns the node for the negation of u."""
+        if u <= 1:
+            return 1 - u
+        key = ("not", u)
+        if key not in self.cache:
+            level, low, high = self.nodes[u]
+            self.cache[key] = self.mk(level, self.negate(low),
+                                      self.negate(high))
+        return self.cache[key]
+
+    OPERATIONS = {
+        "and": lambda a, b: a and b,
+        "or": lambda a, b: a or b,
+        "implies": lambda a, b: (not a) or b,
+        "iff": lambda a, b: a == b,
+    }
+
+    def apply(self, op, u, v):
+        """Combines two nodes with a binary boolean operation."""
+
+        # Terminal cases and short circuits
+        if u <= 1 and v <= 1:
+            return int(self.OPERATIONS[op](bool(u), bool(v)))
+        if op == "and":
+            if u == self.FALSE or v == self.FALSE:
+                return self.FALSE
+            if u == self.TRUE or u == v:
+                return v
+            if v == self.TRUE:
+                return u
+        elif op == "or":
+            if u == self.TRUE or v == self.TRUE:
+                return self.TRUE
+            if u == self.FALSE or u == v:
+                return v
+            if v == self.FALSE:
+                return u
+
+        key = (op, u, v)
+        if key in self.cache:
+            return self.cache[key]
+
+        # Split on the topmost variable of either operand
+        level = min(self.level(u), self.level(v))
+        u_low, u_high = self.cofactors(u, level)
+        v_low, v_high = self.cofactors(v, level)
+        result = self.mk(level,
+                         self.apply(op, u_low, v_low),
+                         self.apply(op, u_high, v_high))
+        self.cache[key] = result
+        return result
+
+    def cofactors(self, u, level):
+        """Returns the (low, high) children of u with respect to level."""
+        if self.level(u) == level:
+            _, low, high = self.nodes[u]
+            return low, high
+        return u, u
+
+    def compile(self, sentence):
+        """Compiles a logical sentence into a node."""
+        if isinstance(sentence, Symbol):
+            return self.var(sentence.name)
+        elif isinstance(sentence, Constant):
+            return self.TRUE if sentence.value else self.FALSE
+        elif isinstance(sentence, Not):
+            return self.negate(self.compile(sentence.operand))
+        elif isinstance(sentence, And):
+            u = self.TRUE
+            for conjunct in sentence.conjuncts:
+                u = self.apply("and", u, self.compile(conjunct))
+            return u
+        elif isinstance(sentence, Or):
+            u = self.FALSE
+            for disjunct in sentence.disjuncts:
+                u = self.apply("or", u, self.compile(disjunct))
+            return u
+        elif isinstance(sentence, Implication):
+            return self.apply("implies",
+                              self.compile(sentence.antecedent),
+                              self.compile(sentence.consequent))
+        elif isinstance(sentence, Biconditional):
+            return self.apply("iff",
+                              self.compile(sentence.left),
+                              self.compile(sentence.right))
+        raise TypeError("must be a logical sentence")
+
+    def satisfiable(self, u):
+        """Checks if a node has at least one model."""
+        return u != self.FALSE
+
+    def entails(self, u, query):
+        """Checks if the knowledge base u entails a sentence or node."""
+        if isinstance(query, Sentence):
+            query = self.compile(query)
+        return self.apply("and", u, self.negate(query)) == self.FALSE
+
+    def restrict(self, u, name, value):
+        """Conditions u on a variable taking the given value."""
+        if name not in self.levels:
+            return u
+        target = self.levels[name]
+        memo = dict()
+
+        def restrict_node(u):
+            if self.level(u) > target:
+                return u
+            if u not in memo:
+                level, low, high = self.nodes[u]
+                if level == target:
+                    memo[u] = high if value else low
+                else:
+                    memo[u] = self.mk(level, restrict_node(low),
+                                      restrict_node(high))
+            return memo[u]
+
+        return restrict_node(u)
+
+    def condition(self, u, model):
+        """Conditions u on every assignment in a model."""
+        for name, value in model.items():
+            u = self.restrict(u, name, value)
+        return u
+
+    def count(self, u, variables=None):
+        """
+        Counts the models of u over the diagram's variables,
+        or over `variables` if given (a superset of those u depends on).
+        """
+        total = len(self.order)
+        memo = {self.FALSE: 0, self.TRUE: 1}
+
+        def level_of(u):
+            return total if u <= 1 else self.nodes[u][0]
+
+        def count_node(u):
+            if u not in memo:
+                level, low, high = self.nodes[u]
+                memo[u] = (count_node(low) * 2 ** (level_of(low) - level - 1)
+                           + count_node(high) * 2 ** (level_of(high) - level - 1))
+            return memo[u]
+
+        models = count_node(u) * 2 ** level_of(u)
+        if variables is not None:
+            models = models * 2 ** len(set(variables) - set(self.order))
+            models = models // 2 ** len(set(self.order) - set(variables))
+        return models
+
+    def size(self, u):
+        """Returns the number of nodes reachable from u."""
+        seen = set()
+        stack = [u]
+        while stack:
+            node = stack.pop()
+            if node in seen:
+                continue
+            seen.add(node)
+            if node > 1:
+                _, low, high = self.nodes[node]
+                stack.extend((low, high))
+        return len(seen)
+
+    def save(self, path, roots):
+        """
+        Writes the nodes reachable from `roots`, a dict mapping names to
+        nodes, to a JSON file that `load` can read without recompiling.
+        """
+        renumbered = {self.FALSE: 0, self.TRUE: 1}
+        nodes = []
+
+        def visit(u):
+            if u not in renumbered:
+                level, low, high = self.nodes[u]
+                low, high = visit(low), visit(high)
+                renumbered[u] = len(nodes) + 2
+                nodes.append([level, low, high])
+            return renumbered[u]
+
+        saved_roots = {name: visit(u) for name, u in roots.items()}
+        with open(path, "w") as f:
+            json.dump({
+                "order": self.order,
+                "nodes": nodes,
+                "roots": saved_roots,
+            }, f)
+
+    @classmethod
+    def load(cls, path):
+        """Reads a file written by `save`. Returns (bdd, roots)."""
+        with open(path) as f:
+            data = json.load(f)
+        bdd = cls(data["order"])
+        ids = [bdd.FALSE, bdd.TRUE]
+        for level, low, high in data["nodes"]:
+            ids.append(bdd.mk(level, ids[low], ids[high]))
+        roots = {name: ids[u] for name, u in data["roots"].items()}
+        return bdd, roots
+
+
+def variable_order(*sentences):
+    """
+    Orders symbols by first appearance in a depth-first walk of the
+    sentences, so that symbols used together end up close in the order.
+    """
+    order = []
+    seen = set()
+
+    def visit(sentence):
+        if isinstance(sentence, Symbol):
+            if sentence.name not in seen:
+                seen.add(sentence.name)
+                order.append(sentence.name)
+        elif isinstance(sentence, Not):
+            visit(sentence.operand)
+        elif isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                visit(conjunct)
+        elif isinstance(sentence, Or):
+            for disjunct in sentence.disjuncts:
+                visit(disjunct)
+        elif isinstance(sentence, Implication):
+            visit(sentence.antecedent)
+            visit(sentence.consequent)
+        elif isinstance(sentence, Biconditional):
+            visit(sentence.left)
+            visit(sentence.right)
+
+    for sentence in sentences:
+        visit(sentence)
+    return order
+
+
+def compile_knowledge(knowledge):
+    """Compiles a knowledge base. Returns (bdd, node)."""
+    bdd = BDD(variable_order(knowledge))
+    return bdd, bdd.compile(knowledge)
+
+
+def bdd_check(knowledge, query):
+    """Checks if knowledge base entails query using a compiled BDD."""
+    bdd, node = compile_knowledge(knowledge)
+    return bdd.entails(node, query)
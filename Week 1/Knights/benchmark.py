@@ -0,0 +1,92 @@
+import sys
+import time
+import tracemalloc
+
+from logic import *
+from bdd import compile_knowledge
+from generator import generate_puzzle
+
+
+def check_each(knowledge, queries):
+    return [model_check(knowledge, query) for query in queries]
+
+
+def check_simplified(knowledge, queries):
+    return model_check_many(simplify(knowledge), queries)
+
+
+def check_bdd(knowledge, queries):
+    bdd, node = compile_knowledge(knowledge)
+    return [bdd.entails(node, query) for query in queries]
+
+
+def check_incremental(knowledge, queries):
+    kb = KnowledgeBase(*knowledge.conjuncts)
+    return [kb.entails(query) for query in queries]
+
+
+def check_parallel(knowledge, queries):
+    return [parallel_model_check(knowledge, query) for query in queries]
+
+
+# Entailment engines: each maps (knowledge, queries) to a list of booleans
+ENGINES = {
+    "model_check": check_each,
+    "model_check_many": model_check_many,
+    "simplify": check_simplified,
+    "bdd": check_bdd,
+    "incremental": check_incremental,
+    "parallel": check_parallel,
+}
+
+
+def measure(engine, knowledge, queries):
+    """Runs an engine. Returns (answers, seconds, peak bytes allocated)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    answers = engine(knowledge, queries)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return answers, elapsed, peak
+
+
+def benchmark(sizes, engines=None, depth=2, seed=0):
+    """
+    Generates a puzzle for each number of characters in `sizes` and
+    solves it with every engine, checking that all engines agree.
+    Returns a list of (n, engine name, seconds, peak bytes) results.
+    """
+    if engines is None:
+        engines = list(ENGINES)
+    results = []
+    for n in sizes:
+        knowledge, symbols, _ = generate_puzzle(n, depth=depth, seed=seed)
+        expected = None
+        for name in engines:
+            answers, elapsed, peak = measure(ENGINES[name], knowledge, symbols)
+            if expected is None:
+                expected = answers
+            elif answers != expected:
+                raise Exception(
+                    f"{name} disagrees with {engines[0]} for n = {n}"
+                )
+            results.append((n, name, elapsed, peak))
+    return results
+
+
+def main():
+    if len(sys.argv) not in [2, 3]:
+        sys.exit("Usage: python benchmark.py max_characters [engines]")
+    sizes = range(1, int(sys.argv[1]) + 1)
+    engines = sys.argv[2].split(",") if len(sys.argv) == 3 else None
+    for name in engines or []:
+        if name not in ENGINES:
+            sys.exit(f"Unknown engine {name}, choose from {', '.join(ENGINES)}")
+    print(f"{'n':>3} {'engine':<18} {'seconds':>10} {'peak KiB':>10}")
+    for n, name, elapsed, peak in benchmark(sizes, engines):
+        print(f"{n:>3} {name:<18} {elapsed:>10.4f} {peak / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import random
+import string
+
+from logic import *
+
+
+def character_names(n):
+    """Returns n character names: A to Z, then A1, B1, and so on."""
+    letters = string.ascii_uppercase
+    return [
+        letters[i % 26] + (str(i // 26) if i >= 26 else "")
+        for i in range(n)
+    ]
+
+
+def knight(name):
+    return Symbol(f"{name} is a Knight")
+
+
+def knave(name):
+    return Symbol(f"{name} is a Knave")
+
+
+def random_statement(rng, names, depth):
+    """
+    Returns a random statement about the given characters: a claim that
+    someone is a knight or a knave, possibly nested inside Not, And, Or
+    and Implication up to `depth` levels.
+    """
+    if depth == 0 or rng.random() < 0.3:
+        name = rng.choice(names)
+        return knight(name) if rng.random() < 0.5 else knave(name)
+
+    connective = rng.choice([Not, And, Or, Implication])
+    if connective is Not:
+        return Not(random_statement(rng, names, depth - 1))
+    if connective is Implication:
+        return Implication(random_statement(rng, names, depth - 1),
+                           random_statement(rng, names, depth - 1))
+    return connective(*[random_statement(rng, names, depth - 1)
+                        for _ in range(rng.randint(2, 3))])
+
+
+def generate_puzzle(n, depth=2, seed=None):
+    """
+    Generates a Knights and Knaves puzzle with n characters.
+
+    Every character is either a knight or a knave but not both, and makes
+    one random statement, which is true if and only if they are a knight.
+    Returns (knowledge, symbols, statements), where statements maps each
+    character's name to what they said.
+    """
+    rng = random.Random(seed)
+    names = character_names(n)
+
+    # Background knowledge about every character
+    knowledge = And()
+    symbols = []
+    for name in names:
+        knowledge.add(And(Or(knight(name), knave(name)),
+                          Not(And(knight(name), knave(name)))))
+        symbols.extend([knight(name), knave(name)])
+
+    # What each character said is true if and only if they are a knight
+    statements = dict()
+    for name in names:
+        statements[name] = random_statement(rng, names, depth)
+        knowledge.add(Biconditional(statements[name], knight(name)))
+
+    return knowledge, symbols, statements
@@ -1,4 +1,6 @@
 import itertools
+import multiprocessing
+import timeit
 
 
 class Sentence():
@@ -7,6 +9,13 @@ class Sentence():
         """Evaluates the logical sentence."""
         raise Exception("nothing to evaluate")
 
+    def partial_evaluate(self, model):
+        """
+        Evaluates the logical sentence in a model that may leave symbols
+        unassigned. Returns True, False, or None when the value is unknown.
+        """
+        raise Exception("nothing to evaluate")
+
     def formula(self):
         """Returns string formula representing logical sentence."""
         return ""
@@ -62,6 +71,10 @@ class Symbol(Sentence):
         except KeyError:
             raise Exception(f"variable {self.name} not in model")
 
+    def partial_evaluate(self, model):
+        value = model.get(self.name)
+        return None if value is None else bool(value)
+
     def formula(self):
         return self.name
 
@@ -86,6 +99,10 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
+    def partial_evaluate(self, model):
+        value = self.operand.partial_evaluate(model)
+        return None if value is None else not value
+
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
@@ -120,6 +137,16 @@ class And(Sentence):
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
+    def partial_evaluate(self, model):
+        result = True
+        for conjunct in self.conjuncts:
+            value = conjunct.partial_evaluate(model)
+            if value is False:
+                return False
+            if value is None:
+                result = None
+        return result
+
     def formula(self):
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
@@ -151,6 +178,16 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
+    def partial_evaluate(self, model):
+        result = False
+        for disjunct in self.disjuncts:
+            value = disjunct.partial_evaluate(model)
+            if value is True:
+                return True
+            if value is None:
+                result = None
+        return result
+
     def formula(self):
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
@@ -183,6 +220,17 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
+    def partial_evaluate(self, model):
+        antecedent = self.antecedent.partial_evaluate(model)
+        if antecedent is False:
+            return True
+        consequent = self.consequent.partial_evaluate(model)
+        if consequent is True:
+            return True
+        if antecedent is True and consequent is False:
+            return False
+        return None
+
     def formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
@@ -216,6 +264,15 @@ class Biconditional(Sentence):
                 or (not self.left.evaluate(model)
                     and not self.right.evaluate(model)))
 
+    def partial_evaluate(self, model):
+        left = self.left.partial_evaluate(model)
+        if left is None:
+            return None
+        right = self.right.partial_evaluate(model)
+        if right is None:
+            return None
+        return left == right
+
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
@@ -225,39 +282,648 @@ class Biconditional(Sentence):
         return set.union(self.left.symbols(), self.right.symbols())
 
 
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
+class Constant(Sentence):
+    def __init__(self, value):
+        self.value = bool(value)
 
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
+    def __eq__(self, other):
+        return isinstance(other, Constant) and self.value == other.value
 
-        # If model has an assignment for each symbol
-        if not symbols:
+    def __hash__(self):
+        return hash(("constant", self.value))
 
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
-            return True
-        else:
+    def __repr__(self):
+        return f"Constant({self.value})"
+
+    def evaluate(self, model):
+        return self.value
+
+    def partial_evaluate(self, model):
+        return self.value
+
+    def formula(self):
+        return "⊤" if self.value else "⊥"
+
+    def symbols(self):
+        return set()
+
+
+TRUE = Constant(True)
+FALSE = Constant(False)
+
+
+def symbol_counts(sentence, counts=None):
+    """Returns a dict mapping each symbol to its number of occurrences."""
+    if counts is None:
+        counts = dict()
+    if isinstance(sentence, Symbol):
+        counts[sentence.name] = counts.get(sentence.name, 0) + 1
+    elif isinstance(sentence, Not):
+        symbol_counts(sentence.operand, counts)
+    elif isinstance(sentence, And):
+        for conjunct in sentence.conjuncts:
+            symbol_counts(conjunct, counts)
+    elif isinstance(sentence, Or):
+        for disjunct in sentence.disjuncts:
+            symbol_counts(disjunct, counts)
+    elif isinstance(sentence, Implication):
+        symbol_counts(sentence.antecedent, counts)
+        symbol_counts(sentence.consequent, counts)
+    elif isinstance(sentence, Biconditional):
+        symbol_counts(sentence.left, counts)
+        symbol_counts(sentence.right, counts)
+    return counts
 
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
 
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
+def branching_order(symbols, *sentences):
+    """Orders symbols so that the most frequently occurring come first."""
+    counts = dict()
+    for sentence in sentences:
+        symbol_counts(sentence, counts)
+    return sorted(symbols, key=lambda symbol: (-counts.get(symbol, 0), symbol))
 
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
 
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
+def check_all(knowledge, query, symbols, model):
+    """Checks if knowledge base entails query, given a particular model."""
+
+    # If knowledge base is already false, no completion can refute query
+    kb_value = knowledge.partial_evaluate(model)
+    if kb_value is False:
+        return True
+
+    # If query is already true, it holds in every completion
+    query_value = query.partial_evaluate(model)
+    if query_value is True:
+        return True
+
+    # If knowledge base is true but query false, entailment fails
+    if kb_value is True and query_value is False:
+        return False
+
+    # Choose the most frequent of the remaining unused symbols
+    p, remaining = symbols[0], symbols[1:]
+
+    # Create a model where the symbol is true
+    model_true = model.copy()
+    model_true[p] = True
+
+    # Create a model where the symbol is false
+    model_false = model.copy()
+    model_false[p] = False
+
+    # Ensure entailment holds in both models
+    return (check_all(knowledge, query, remaining, model_true) and
+            check_all(knowledge, query, remaining, model_false))
+
+
+def model_check(knowledge, query):
+    """Checks if knowledge base entails query."""
 
     # Get all symbols in both knowledge and query
     symbols = set.union(knowledge.symbols(), query.symbols())
 
     # Check that knowledge entails query
+    symbols = branching_order(symbols, knowledge, query)
     return check_all(knowledge, query, symbols, dict())
+
+
+def check_cube(task):
+    """Runs check_all on one cube of a parallel model check."""
+    knowledge, query, symbols, model = task
+    return check_all(knowledge, query, symbols, model)
+
+
+def parallel_model_check(knowledge, query, k=None, processes=None):
+    """
+    Checks if knowledge base entails query, splitting the enumeration
+    across a process pool.
+
+    The first `k` symbols are fixed in each of the 2^k possible ways and
+    every resulting cube is checked by a worker. As soon as any cube
+    contains a counterexample, the pool is terminated.
+    """
+    symbols = set.union(knowledge.symbols(), query.symbols())
+    symbols = branching_order(symbols, knowledge, query)
+
+    # Default to a few cubes per process
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    if k is None:
+        k = max(processes - 1, 0).bit_length() + 2
+    k = min(k, len(symbols))
+
+    fixed, remaining = symbols[:k], symbols[k:]
+    tasks = [
+        (knowledge, query, remaining, dict(zip(fixed, values)))
+        for values in itertools.product((True, False), repeat=k)
+    ]
+
+    pool = multiprocessing.Pool(processes)
+    try:
+        for result in pool.imap_unordered(check_cube, tasks):
+            if not result:
+                return False
+        return True
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def satisfying_models(knowledge, symbols):
+    """Yields every model over `symbols` in which knowledge base is true."""
+
+    def enumerate_all(remaining, model):
+        """Yields all completions of a partial model that satisfy knowledge."""
+
+        # Prune as soon as the knowledge base is falsified
+        if knowledge.partial_evaluate(model) is False:
+            return
+
+        # If model has an assignment for each symbol
+        if not remaining:
+            yield model
+            return
+
+        # Branch on the most frequent of the remaining unused symbols
+        p, remaining = remaining[0], remaining[1:]
+        for value in (True, False):
+            model_extended = model.copy()
+            model_extended[p] = value
+            yield from enumerate_all(remaining, model_extended)
+
+    yield from enumerate_all(branching_order(symbols, knowledge), dict())
+
+
+def model_check_many(knowledge, queries):
+    """
+    Checks which of many queries the knowledge base entails.
+
+    Models of the knowledge base are enumerated once and every query is
+    evaluated against them. Returns a list of booleans, one per query.
+    """
+    queries = list(queries)
+    if not queries:
+        return []
+
+    # Enumerate over the symbols of the knowledge base and every query
+    symbols = set.union(knowledge.symbols(),
+                        *[query.symbols() for query in queries])
+
+    # A query stays entailed until a model of the knowledge base falsifies it
+    entailed = [True] * len(queries)
+    undecided = set(range(len(queries)))
+    for model in satisfying_models(knowledge, symbols):
+        for i in list(undecided):
+            if not queries[i].evaluate(model):
+                entailed[i] = False
+                undecided.remove(i)
+        if not undecided:
+            break
+    return entailed
+
+
+def entailed_literals(knowledge):
+    """
+    Returns the set of literals (symbols and negated symbols)
+    over the symbols of the knowledge base that it entails.
+    """
+    symbols = knowledge.symbols()
+
+    # Track, for each symbol, the values it takes across all models
+    values = {symbol: set() for symbol in symbols}
+    for model in satisfying_models(knowledge, symbols):
+        for symbol in symbols:
+            values[symbol].add(model[symbol])
+
+    literals = set()
+    for symbol, seen in values.items():
+        if True not in seen:
+            literals.add(Not(Symbol(symbol)))
+        if False not in seen:
+            literals.add(Symbol(symbol))
+    return literals
+
+
+def is_literal(sentence):
+    """Checks if a sentence is a symbol or a negated symbol."""
+    return isinstance(sentence, Symbol) or (
+        isinstance(sentence, Not) and isinstance(sentence.operand, Symbol)
+    )
+
+
+def sentence_size(sentence):
+    """Returns the number of nodes in a logical sentence."""
+    if isinstance(sentence, Not):
+        return 1 + sentence_size(sentence.operand)
+    elif isinstance(sentence, And):
+        return 1 + sum(sentence_size(c) for c in sentence.conjuncts)
+    elif isinstance(sentence, Or):
+        return 1 + sum(sentence_size(d) for d in sentence.disjuncts)
+    elif isinstance(sentence, Implication):
+        return (1 + sentence_size(sentence.antecedent)
+                + sentence_size(sentence.consequent))
+    elif isinstance(sentence, Biconditional):
+        return 1 + sentence_size(sentence.left) + sentence_size(sentence.right)
+    return 1
+
+
+def condition(sentence, model):
+    """Replaces every symbol assigned in model with its constant value."""
+    if isinstance(sentence, Symbol):
+        if sentence.name in model:
+            return Constant(model[sentence.name])
+        return sentence
+    elif isinstance(sentence, Not):
+        return Not(condition(sentence.operand, model))
+    elif isinstance(sentence, And):
+        return And(*[condition(c, model) for c in sentence.conjuncts])
+    elif isinstance(sentence, Or):
+        return Or(*[condition(d, model) for d in sentence.disjuncts])
+    elif isinstance(sentence, Implication):
+        return Implication(condition(sentence.antecedent, model),
+                           condition(sentence.consequent, model))
+    elif isinstance(sentence, Biconditional):
+        return Biconditional(condition(sentence.left, model),
+                             condition(sentence.right, model))
+    return sentence
+
+
+def rewrite(sentence):
+    """
+    Rewrites a sentence bottom-up into a smaller equivalent one:
+    flattens nested And/Or, removes duplicate operands, removes double
+    negation and folds tautologies and contradictions into constants.
+    """
+    if isinstance(sentence, Not):
+        operand = rewrite(sentence.operand)
+        if isinstance(operand, Constant):
+            return Constant(not operand.value)
+        if isinstance(operand, Not):
+            return operand.operand
+        return Not(operand)
+
+    elif isinstance(sentence, (And, Or)):
+        conjunction = isinstance(sentence, And)
+        operands = sentence.conjuncts if conjunction else sentence.disjuncts
+
+        # An And is absorbed by False and ignores True; an Or the reverse
+        absorbing = Constant(not conjunction)
+        flattened = []
+        seen = set()
+        pending = [rewrite(operand) for operand in operands]
+        while pending:
+            operand = pending.pop(0)
+            if isinstance(operand, type(sentence)):
+                operands = (operand.conjuncts if conjunction
+                            else operand.disjuncts)
+                pending[0:0] = operands
+                continue
+            if isinstance(operand, Constant):
+                if operand == absorbing:
+                    return absorbing
+                continue
+            if operand in seen:
+                continue
+
+            # An operand alongside its own negation decides the result
+            complement = (operand.operand if isinstance(operand, Not)
+                          else Not(operand))
+            if complement in seen:
+                return absorbing
+            seen.add(operand)
+            flattened.append(operand)
+
+        if not flattened:
+            return Constant(conjunction)
+        if len(flattened) == 1:
+            return flattened[0]
+        return And(*flattened) if conjunction else Or(*flattened)
+
+    elif isinstance(sentence, Implication):
+        antecedent = rewrite(sentence.antecedent)
+        consequent = rewrite(sentence.consequent)
+        if antecedent == FALSE or consequent == TRUE:
+            return TRUE
+        if antecedent == TRUE:
+            return consequent
+        if consequent == FALSE:
+            return rewrite(Not(antecedent))
+        if antecedent == consequent:
+            return TRUE
+        return Implication(antecedent, consequent)
+
+    elif isinstance(sentence, Biconditional):
+        left = rewrite(sentence.left)
+        right = rewrite(sentence.right)
+        if isinstance(left, Constant) and isinstance(right, Constant):
+            return Constant(left.value == right.value)
+        for constant, other in ((left, right), (right, left)):
+            if constant == TRUE:
+                return other
+            if constant == FALSE:
+                return rewrite(Not(other))
+        if left == right:
+            return TRUE
+        if left == Not(right) or Not(left) == right:
+            return FALSE
+        return Biconditional(left, right)
+
+    return sentence
+
+
+def simplify(sentence):
+    """
+    Returns a smaller sentence equivalent to `sentence`.
+
+    After rewriting, every literal conjunct at the top level is a unit
+    fact; each is substituted into the rest of the sentence, which is
+    rewritten again, until no new unit facts appear.
+    """
+    result = rewrite(sentence)
+    assignment = dict()
+    while isinstance(result, And):
+
+        # Collect top-level literals not yet applied
+        units = dict()
+        for conjunct in result.conjuncts:
+            if is_literal(conjunct):
+                name = next(iter(conjunct.symbols()))
+                value = isinstance(conjunct, Symbol)
+                if units.get(name, value) != value:
+                    return FALSE
+                units[name] = value
+        if all(assignment.get(name) == value
+               for name, value in units.items()):
+            break
+        for name, value in units.items():
+            if assignment.get(name, value) != value:
+                return FALSE
+        assignment.update(units)
+
+        # Simplify the remaining formula under the unit facts
+        rest = rewrite(condition(result, assignment))
+        literals = [Symbol(name) if value else Not(Symbol(name))
+                    for name, value in sorted(assignment.items())]
+        result = rewrite(And(*literals, rest))
+    return result
+
+
+def best_time(function, repeat=5):
+    """
+    Returns the fastest of `repeat` timings of a call to `function`, in
+    seconds per call, each timing calls enough times to take 0.2 seconds.
+    """
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+def simplification_report(knowledge, queries, repeat=5):
+    """
+    Simplifies a knowledge base and reports how much it shrank and how
+    model checking `queries` against it sped up, timing each side as the
+    best of `repeat` runs. Returns a dict.
+    """
+    queries = list(queries)
+    simplified = simplify(knowledge)
+    before = [model_check(knowledge, query) for query in queries]
+    after = [model_check(simplified, query) for query in queries]
+    if before != after:
+        raise Exception("simplified knowledge base is not equivalent")
+
+    simplify_time = best_time(lambda: simplify(knowledge), repeat)
+    original_time = best_time(
+        lambda: [model_check(knowledge, query) for query in queries], repeat
+    )
+    simplified_time = best_time(
+        lambda: [model_check(simplified, query) for query in queries], repeat
+    )
+
+    return {
+        "sentence": simplified,
+        "original_size": sentence_size(knowledge),
+        "simplified_size": sentence_size(simplified),
+        "simplify_time": simplify_time,
+        "original_time": original_time,
+        "simplified_time": simplified_time,
+        "speedup": original_time / max(simplified_time, 1e-9),
+    }
+
+
+class KnowledgeBase():
+    """
+    Knowledge base that is built up one fact at a time and keeps its
+    solver state between queries.
+
+    Sentences are converted to clauses (lists of nonzero integers, where
+    -v means "not v") with the Tseitin encoding. Unit facts are propagated
+    as soon as they are added and kept, queries are answered by DPLL
+    search, and entailed queries are remembered since adding facts can
+    never make them false again.
+    """
+
+    def __init__(self, *sentences):
+        self.knowledge = And()
+
+        # Variables, numbered from 1, for symbols and encoded subformulas
+        self.variables = dict()
+        self.encoded = dict()
+        self.count = 0
+
+        # Clauses, and for each literal the clauses it appears in
+        self.clauses = []
+        self.occurrences = dict()
+
+        # Assignments implied by the knowledge base alone
+        self.units = dict()
+        self.consistent = True
+
+        # Queries known to be entailed
+        self.entailed = set()
+
+        for sentence in sentences:
+            self.add(sentence)
+
+    def variable(self, name):
+        """Returns the variable for a symbol, creating it if needed."""
+        if name not in self.variables:
+            self.count += 1
+            self.variables[name] = self.count
+        return self.variables[name]
+
+    def encode(self, sentence):
+        """Returns a literal equivalent to sentence, adding its clauses."""
+        if isinstance(sentence, Symbol):
+            return self.variable(sentence.name)
+        if isinstance(sentence, Not):
+            return -self.encode(sentence.operand)
+        if sentence in self.encoded:
+            return self.encoded[sentence]
+
+        if isinstance(sentence, Constant):
+            literal = self.fresh()
+            self.add_clause([literal if sentence.value else -literal])
+        elif isinstance(sentence, (And, Or)):
+            conjunction = isinstance(sentence, And)
+            operands = [self.encode(operand) for operand in (
+                sentence.conjuncts if conjunction else sentence.disjuncts
+            )]
+            literal = self.fresh()
+            sign = 1 if conjunction else -1
+
+            # For And: literal implies each operand, all operands imply it
+            for operand in operands:
+                self.add_clause([-sign * literal, sign * operand])
+            self.add_clause([sign * literal] + [-sign * o for o in operands])
+        elif isinstance(sentence, Implication):
+            return self.encode(Or(Not(sentence.antecedent),
+                                  sentence.consequent))
+        elif isinstance(sentence, Biconditional):
+            left = self.encode(sentence.left)
+            right = self.encode(sentence.right)
+            literal = self.fresh()
+            self.add_clause([-literal, -left, right])
+            self.add_clause([-literal, left, -right])
+            self.add_clause([literal, left, right])
+            self.add_clause([literal, -left, -right])
+        else:
+            raise TypeError("must be a logical sentence")
+
+        self.encoded[sentence] = literal
+        return literal
+
+    def fresh(self):
+        """Returns a new auxiliary variable."""
+        self.count += 1
+        return self.count
+
+    def add_clause(self, clause):
+        clause = list(dict.fromkeys(clause))
+        self.clauses.append(clause)
+        for literal in clause:
+            self.occurrences.setdefault(literal, []).append(
+                len(self.clauses) - 1
+            )
+
+    def add(self, sentence):
+        """Adds a fact and propagates any unit facts it implies."""
+        Sentence.validate(sentence)
+        self.knowledge.add(sentence)
+        start = len(self.clauses)
+
+        # Top-level conjuncts become separate facts
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add_clause([self.encode(conjunct)])
+        else:
+            self.add_clause([self.encode(sentence)])
+
+        if self.consistent:
+            self.consistent = self.propagate(self.units, [], start)
+
+    def value(self, assignment, literal):
+        """Returns the value of a literal, or None if unassigned."""
+        value = assignment.get(abs(literal))
+        if value is None:
+            return None
+        return value if literal > 0 else not value
+
+    def propagate(self, assignment, queue, start=None):
+        """
+        Extends assignment by unit propagation. Clauses from index `start`
+        on are scanned in full, then only those clauses that contain the
+        negation of a newly assigned literal. Returns False on conflict.
+        """
+        def assign(literal):
+            assignment[abs(literal)] = literal > 0
+            queue.append(literal)
+
+        def check(clause):
+            unassigned = None
+            for literal in clause:
+                value = self.value(assignment, literal)
+                if value is True:
+                    return True
+                if value is None:
+                    if unassigned is not None:
+                        return True
+                    unassigned = literal
+            if unassigned is None:
+                return False
+            assign(unassigned)
+            return True
+
+        if start is not None:
+            for clause in self.clauses[start:]:
+                if not check(clause):
+                    return False
+
+        while queue:
+            literal = queue.pop()
+            for index in self.occurrences.get(-literal, []):
+                if not check(self.clauses[index]):
+                    return False
+        return True
+
+    def satisfiable(self, assignment, start):
+        """Checks by DPLL search if the clauses have a model extending
+        assignment, where clauses before `start` are already propagated."""
+        if not self.propagate(assignment, [], start):
+            return False
+
+        def search(assignment):
+            for variable in range(1, self.count + 1):
+                if variable not in assignment:
+                    break
+            else:
+                return True
+            for literal in (variable, -variable):
+                extended = dict(assignment)
+                extended[variable] = literal > 0
+                if self.propagate(extended, [literal]) and search(extended):
+                    return True
+            return False
+
+        return search(assignment)
+
+    def entails(self, query, assumptions=()):
+        """
+        Checks if the knowledge base, together with any temporary
+        assumptions, entails query. Assumptions are retracted afterwards.
+        """
+        Sentence.validate(query)
+        if not self.consistent:
+            return True
+        assumptions = tuple(assumptions)
+        if not assumptions and query in self.entailed:
+            return True
+
+        # Remember state so that the query's clauses can be retracted
+        clauses, count = len(self.clauses), self.count
+        variables, encoded = set(self.variables), set(self.encoded)
+
+        try:
+            start = len(self.clauses)
+            for assumption in assumptions:
+                self.add_clause([self.encode(assumption)])
+            self.add_clause([-self.encode(query)])
+            entailed = not self.satisfiable(dict(self.units), start)
+        finally:
+            for clause in self.clauses[clauses:]:
+                for literal in clause:
+                    self.occurrences[literal].pop()
+            del self.clauses[clauses:]
+            self.count = count
+            for name in set(self.variables) - variables:
+                del self.variables[name]
+            for sentence in set(self.encoded) - encoded:
+                del self.encoded[sentence]
+
+        # Entailed queries are learned as facts of the knowledge base
+        if entailed and not assumptions:
+            self.entailed.add(query)
+            if is_literal(query) and query.symbols() <= set(self.variables):
+                start = len(self.clauses)
+                self.add_clause([self.encode(query)])
+                self.consistent = self.propagate(self.units, [], start)
+        return entailed
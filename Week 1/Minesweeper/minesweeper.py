@@ -1,5 +1,67 @@
+import functools
 import itertools
+import math
 import random
+import time
+from collections import deque
+
+import numpy as np
+
+# Search nodes allowed when enumerating one frontier component exactly
+ENUMERATION_LIMIT = 50000
+
+# Configurations sampled when a component is too large to enumerate
+GUESS_SAMPLES = 200
+
+# Largest board, in cells, whose neighbour tuples are kept in a table
+NEIGHBOUR_TABLE_LIMIT = 40000
+
+
+def cell_neighbours(cell, height, width):
+    """
+    Returns the tuple of cells within one row and column of `cell` on a
+    height x width board, excluding the cell itself.
+    """
+    i, j = cell
+    return tuple(
+        (row, col)
+        for row in range(max(i - 1, 0), min(i + 2, height))
+        for col in range(max(j - 1, 0), min(j + 2, width))
+        if (row, col) != (i, j)
+    )
+
+
+class NeighbourLookup():
+    """
+    Maps a cell to its neighbours by computing them on demand, for boards
+    too large to keep a table of every cell's neighbours.
+    """
+
+    def __init__(self, height, width):
+        self.height = height
+        self.width = width
+
+    def __getitem__(self, cell):
+        return cell_neighbours(cell, self.height, self.width)
+
+
+@functools.lru_cache(maxsize=4)
+def neighbour_lists(height, width):
+    """
+    Returns a mapping from every cell of a height x width board to the
+    tuple of cells within one row and column of it, excluding itself.
+
+    Boards of up to NEIGHBOUR_TABLE_LIMIT cells get a dict, shared by
+    every game and AI with the same board size; larger boards get a
+    NeighbourLookup, so no table is held in memory for them.
+    """
+    if height * width > NEIGHBOUR_TABLE_LIMIT:
+        return NeighbourLookup(height, width)
+    return {
+        (i, j): cell_neighbours((i, j), height, width)
+        for i in range(height)
+        for j in range(width)
+    }
 
 
 class Minesweeper():
@@ -33,6 +95,9 @@ class Minesweeper():
         # At first, player has found no mines
         self.mines_found = set()
 
+        # Cells adjacent to each cell
+        self.neighbours = neighbour_lists(height, width)
+
     def print(self):
         """
         Prints a text-based representation
@@ -59,29 +124,90 @@ class Minesweeper():
         not including the cell itself.
         """
 
-        # Keep count of nearby mines
-        count = 0
+        return sum(self.board[i][j] for i, j in self.neighbours[cell])
+
+    def won(self):
+        """
+        Checks if all mines have been flagged.
+        """
+        return self.mines_found == self.mines
+
+    def adjacent(self, cell):
+        """
+        Returns the cells within one row and column of a given cell.
+        """
+        return self.neighbours[cell]
 
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
+    def reveal(self, cell):
+        """
+        Returns the set of cells revealed by clicking a safe cell: the
+        cell itself and, if it has no nearby mines, the whole connected
+        region of cells with no nearby mines together with its border.
+        """
+        revealed = {cell}
+        frontier = deque([cell])
+        while frontier:
+            current = frontier.popleft()
+            if self.nearby_mines(current) != 0:
+                continue
+            for neighbour in self.adjacent(current):
+                if neighbour not in revealed:
+                    revealed.add(neighbour)
+                    frontier.append(neighbour)
+        return revealed
 
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
 
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
+class ArrayMinesweeper(Minesweeper):
+    """
+    Minesweeper game on a NumPy board, for large boards.
 
-        return count
+    Mines are placed by sampling cells without replacement, and the
+    number of nearby mines for every cell is computed once, by summing
+    the eight shifted copies of the board (a 3x3 convolution).
+    """
 
-    def won(self):
+    def __init__(self, height=8, width=8, mines=8):
+
+        # Set initial width, height, and number of mines
+        self.height = height
+        self.width = width
+
+        # Place mines at distinct cells, seeded from the random module
+        # so that random.seed still makes games reproducible
+        rng = np.random.default_rng(random.getrandbits(64))
+        positions = rng.choice(height * width, size=mines, replace=False)
+        self.board = np.zeros((height, width), dtype=bool)
+        self.board.flat[positions] = True
+        self.mines = set(
+            (int(i), int(j)) for i, j in zip(*np.divmod(positions, width))
+        )
+
+        # Count nearby mines for every cell at once
+        padded = np.pad(self.board.astype(np.uint8), 1)
+        self.counts = np.zeros((height, width), dtype=np.uint8)
+        for di in range(3):
+            for dj in range(3):
+                if (di, dj) != (1, 1):
+                    self.counts += padded[di:di + height, dj:dj + width]
+
+        # At first, player has found no mines
+        self.mines_found = set()
+
+        # Cells adjacent to each cell
+        self.neighbours = neighbour_lists(height, width)
+
+    def is_mine(self, cell):
+        i, j = cell
+        return bool(self.board[i, j])
+
+    def nearby_mines(self, cell):
         """
-        Checks if all mines have been flagged.
+        Returns the number of mines that are
+        within one row and column of a given cell,
+        not including the cell itself.
         """
-        return self.mines_found == self.mines
+        i, j = cell
+        return int(self.counts[i, j])
 
 
 class Sentence():
@@ -139,16 +265,364 @@ class Sentence():
             self.cells.remove(cell)
 
 
+class KnowledgeStore():
+    """
+    Collection of sentences keyed by their frozen set of cells.
+
+    Empty sentences and duplicates of a stored cell set are never kept,
+    and an index from each cell to the keys that contain it allows
+    overlapping, subset and superset sentences to be found quickly.
+    Sentences must be marked through the store so it can rekey them.
+    """
+
+    def __init__(self):
+        self.sentences = dict()
+        self.index = dict()
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def __iter__(self):
+        return iter(list(self.sentences.values()))
+
+    def __contains__(self, sentence):
+        return self.sentences.get(frozenset(sentence.cells)) == sentence
+
+    def get(self, cells):
+        """
+        Returns the sentence stored for a set of cells, or None.
+        """
+        return self.sentences.get(frozenset(cells))
+
+    def add(self, sentence):
+        """
+        Stores a sentence unless it is empty or its cells are already
+        stored. Returns True if the sentence was added.
+        """
+        key = frozenset(sentence.cells)
+        if not key or key in self.sentences:
+            return False
+        self.sentences[key] = sentence
+        for cell in key:
+            self.index.setdefault(cell, set()).add(key)
+        return True
+
+    def discard(self, sentence):
+        """
+        Removes a sentence from the store if it is there.
+        """
+        key = frozenset(sentence.cells)
+        if self.sentences.get(key) is not sentence:
+            return
+        del self.sentences[key]
+        for cell in key:
+            keys = self.index[cell]
+            keys.discard(key)
+            if not keys:
+                del self.index[cell]
+
+    def containing(self, cell):
+        """
+        Returns the sentences that contain a cell.
+        """
+        return [self.sentences[key] for key in self.index.get(cell, ())]
+
+    def mark(self, cell, mine):
+        """
+        Marks a cell as a mine or as safe in every sentence containing it.
+        Returns the updated sentences that are still stored.
+        """
+        updated = []
+        for sentence in self.containing(cell):
+            self.discard(sentence)
+            if mine:
+                sentence.mark_mine(cell)
+            else:
+                sentence.mark_safe(cell)
+            if self.add(sentence):
+                updated.append(sentence)
+        return updated
+
+    def subsets(self, sentence):
+        """
+        Returns the stored sentences whose cells are a proper subset
+        of the cells of `sentence`.
+        """
+        key = frozenset(sentence.cells)
+        candidates = set()
+        for cell in key:
+            candidates.update(self.index.get(cell, ()))
+        return [self.sentences[other] for other in candidates
+                if len(other) < len(key) and other < key]
+
+    def supersets(self, sentence):
+        """
+        Returns the stored sentences whose cells are a proper superset
+        of the cells of `sentence`.
+        """
+        key = frozenset(sentence.cells)
+        if not key:
+            return []
+
+        # Every superset contains the cell with the fewest sentences
+        rarest = min(key, key=lambda cell: len(self.index.get(cell, ())))
+        return [self.sentences[other] for other in self.index.get(rarest, ())
+                if len(other) > len(key) and key < other]
+
+
+class SearchLimitReached(Exception):
+    pass
+
+
+class NodeBudget():
+    """
+    Number of search nodes that one or more searches may still try.
+    """
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+
+
+def constraint_components(sentences):
+    """
+    Splits sentences into groups that share no cells with each other.
+    Returns a list of lists of sentences.
+    """
+    parent = dict()
+
+    def find(cell):
+        while parent[cell] != cell:
+            parent[cell] = parent[parent[cell]]
+            cell = parent[cell]
+        return cell
+
+    for sentence in sentences:
+        cells = list(sentence.cells)
+        for cell in cells:
+            parent.setdefault(cell, cell)
+        for cell in cells[1:]:
+            parent[find(cell)] = find(cells[0])
+
+    groups = dict()
+    for sentence in sentences:
+        root = find(next(iter(sentence.cells)))
+        groups.setdefault(root, []).append(sentence)
+    return list(groups.values())
+
+
+def configurations(cells, sentences, budget, rng=None):
+    """
+    Yields every assignment of mines to `cells` (a list of booleans in
+    the same order) that satisfies all sentences. With `rng`, values are
+    tried in random order. Every assignment tried is taken from the
+    NodeBudget `budget`; raises SearchLimitReached once it is spent.
+    """
+    position = {cell: i for i, cell in enumerate(cells)}
+    touching = [[] for _ in cells]
+    need = []
+    left = []
+    for k, sentence in enumerate(sentences):
+        need.append(sentence.count)
+        left.append(len(sentence.cells))
+        for cell in sentence.cells:
+            touching[position[cell]].append(k)
+
+    def assign(i, value):
+        feasible = True
+        for k in touching[i]:
+            left[k] -= 1
+            need[k] -= value
+            if need[k] < 0 or need[k] > left[k]:
+                feasible = False
+        return feasible
+
+    def unassign(i, value):
+        for k in touching[i]:
+            left[k] += 1
+            need[k] += value
+
+    n = len(cells)
+    values = [False] * n
+    order = [(True, False)] * n
+    tried = [0] * n
+    i = 0
+    while True:
+        if i == n:
+            yield values
+            i -= 1
+            unassign(i, values[i])
+            continue
+        if tried[i] == 2:
+            tried[i] = 0
+            i -= 1
+            if i < 0:
+                return
+            unassign(i, values[i])
+            continue
+        if tried[i] == 0 and rng is not None:
+            order[i] = (True, False) if rng.random() < 0.5 else (False, True)
+        value = order[i][tried[i]]
+        tried[i] += 1
+        budget.nodes -= 1
+        if budget.nodes < 0:
+            raise SearchLimitReached
+        values[i] = value
+        if assign(i, value):
+            i += 1
+        else:
+            unassign(i, value)
+
+
+def count_configurations(sentences, max_nodes=ENUMERATION_LIMIT,
+                         samples=GUESS_SAMPLES, rng=None):
+    """
+    Counts the mine configurations of one component of sentences.
+
+    Returns (cells, weights, cell_weights) where weights[k] is the number
+    of configurations with k mines and cell_weights[k][i] how many of
+    those have a mine in cells[i]. When exact enumeration exceeds
+    `max_nodes`, the counts are instead taken from up to `samples`
+    random samples, which share a second budget of `max_nodes` search
+    nodes; whatever was sampled when it runs out is counted, so the
+    weights are empty if no configuration was found in time.
+    """
+    cells = []
+    seen = set()
+    for sentence in sentences:
+        for cell in sorted(sentence.cells):
+            if cell not in seen:
+                seen.add(cell)
+                cells.append(cell)
+
+    def tally(solutions):
+        weights = dict()
+        cell_weights = dict()
+        for values in solutions:
+            k = sum(values)
+            weights[k] = weights.get(k, 0) + 1
+            row = cell_weights.setdefault(k, [0] * len(cells))
+            for i, value in enumerate(values):
+                row[i] += value
+        return weights, cell_weights
+
+    try:
+        weights, cell_weights = tally(
+            configurations(cells, sentences, NodeBudget(max_nodes))
+        )
+    except SearchLimitReached:
+        rng = rng or random.Random(random.getrandbits(64))
+        budget = NodeBudget(max_nodes)
+        found = []
+        while len(found) < samples:
+            try:
+                found.append(list(next(
+                    configurations(cells, sentences, budget, rng)
+                )))
+            except (SearchLimitReached, StopIteration):
+                break
+        weights, cell_weights = tally(found)
+    return cells, weights, cell_weights
+
+
+def local_estimates(sentences):
+    """
+    Returns a dict mapping each cell of the sentences to the average,
+    over the sentences that mention it, of count / number of cells.
+    """
+    totals = dict()
+    for sentence in sentences:
+        density = sentence.count / len(sentence.cells)
+        for cell in sentence.cells:
+            total, mentions = totals.get(cell, (0, 0))
+            totals[cell] = (total + density, mentions + 1)
+    return {cell: total / mentions
+            for cell, (total, mentions) in totals.items()}
+
+
+def linear_deductions(sentences):
+    """
+    Derives mines and safe cells from sentences by linear algebra.
+
+    Each sentence is a row of a sparse 0/1 matrix over its cells, with
+    the count as the right-hand side. Every independent component is
+    reduced to row echelon form by Gaussian elimination. For each reduced
+    row, if the right-hand side equals the smallest or largest value the
+    row can take with 0/1 cells, every cell in the row is determined.
+    Elimination is fraction-free: rows keep integer coefficients,
+    divided through by their greatest common divisor.
+    Returns (mines, safes).
+    """
+    mines = set()
+    safes = set()
+    for component in constraint_components(sentences):
+        rows = [({cell: 1 for cell in sentence.cells}, sentence.count)
+                for sentence in component]
+        columns = sorted(set(cell for row, _ in rows for cell in row))
+
+        # Gaussian elimination to reduced row echelon form
+        pivot = 0
+        for column in columns:
+            for r in range(pivot, len(rows)):
+                if column in rows[r][0]:
+                    break
+            else:
+                continue
+            rows[pivot], rows[r] = rows[r], rows[pivot]
+            row, rhs = rows[pivot]
+            scale = row[column]
+            for r, (other, other_rhs) in enumerate(rows):
+                if r == pivot or column not in other:
+                    continue
+                factor = other[column]
+                combined = {cell: value * scale
+                            for cell, value in other.items()}
+                for cell, value in row.items():
+                    updated = combined.get(cell, 0) - factor * value
+                    if updated:
+                        combined[cell] = updated
+                    else:
+                        combined.pop(cell, None)
+                combined_rhs = other_rhs * scale - factor * rhs
+                divisor = math.gcd(combined_rhs, *combined.values())
+                if divisor > 1:
+                    combined = {cell: value // divisor
+                                for cell, value in combined.items()}
+                    combined_rhs //= divisor
+                rows[r] = (combined, combined_rhs)
+            pivot += 1
+
+        # Bounds reasoning on every reduced row
+        for row, rhs in rows:
+            if not row:
+                continue
+            lowest = sum(value for value in row.values() if value < 0)
+            highest = sum(value for value in row.values() if value > 0)
+            if rhs == lowest or rhs == highest:
+                for cell, value in row.items():
+                    if (value > 0) == (rhs == highest):
+                        mines.add(cell)
+                    else:
+                        safes.add(cell)
+    return mines, safes
+
+
 class MinesweeperAI():
     """
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    def __init__(self, height=8, width=8, mines=None, inference="pairwise",
+                 record_stats=False):
 
-        # Set initial height and width
+        # Set initial height and width, and total mines if known
         self.height = height
         self.width = width
+        self.total_mines = mines
+
+        # Either "pairwise" subset inference or "linear" elimination
+        if inference not in ("pairwise", "linear"):
+            raise ValueError(f"unknown inference mode {inference}")
+        self.inference = inference
 
         # Keep track of which cells have been clicked on
         self.moves_made = set()
@@ -157,8 +631,43 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Cells known to be safe, in the order they were found, that
+        # may not have been chosen yet
+        self.safe_moves = deque()
+
+        # Sentences about the game known to be true
+        self.knowledge = KnowledgeStore()
+
+        # Number of sentences in the knowledge base after each move
+        self.knowledge_sizes = []
+
+        # Solved frontier components, keyed by their sentences
+        self.component_cache = dict()
+
+        # Cells adjacent to each cell
+        self.neighbours = neighbour_lists(height, width)
+
+        # Cells not yet chosen and not known to be mines, with the
+        # position of each in the list for constant time removal
+        self.candidates = list(itertools.product(range(height),
+                                                 range(width)))
+        self.candidate_positions = {
+            cell: i for i, cell in enumerate(self.candidates)
+        }
+
+        # Worklist of sentences that are new or have changed
+        # and still need to be checked for inferences
+        self.pending = deque()
+        self.pending_ids = set()
+
+        # Cells of sentences changed since linear inference last ran
+        self.changed_cells = set()
+
+        # Per-move statistics records, and the counters for the move
+        # in progress, only kept if record_stats is set
+        self.record_stats = record_stats
+        self.move_stats = []
+        self.stats = None
 
     def mark_mine(self, cell):
         """
@@ -166,17 +675,127 @@ class MinesweeperAI():
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+        self.remove_candidate(cell)
+        for sentence in self.knowledge.mark(cell, mine=True):
+            self.enqueue(sentence)
 
     def mark_safe(self, cell):
         """
         Marks a cell as safe, and updates all knowledge
         to mark that cell as safe as well.
         """
+        if cell not in self.safes and cell not in self.moves_made:
+            self.safe_moves.append(cell)
         self.safes.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_safe(cell)
+        for sentence in self.knowledge.mark(cell, mine=False):
+            self.enqueue(sentence)
+
+    def remove_candidate(self, cell):
+        """
+        Removes a cell from the pool of candidate moves, if present,
+        by moving the last candidate into its place.
+        """
+        i = self.candidate_positions.pop(cell, None)
+        if i is None:
+            return
+        last = self.candidates.pop()
+        if last != cell:
+            self.candidates[i] = last
+            self.candidate_positions[last] = i
+
+    def enqueue(self, sentence):
+        """
+        Adds a sentence to the worklist if it is not already on it.
+        """
+        if id(sentence) not in self.pending_ids:
+            self.pending_ids.add(id(sentence))
+            self.pending.append(sentence)
+
+    def add_sentence(self, sentence):
+        """
+        Adds a sentence to the knowledge base unless it is empty
+        or already known. Returns True if added.
+        """
+        if not self.knowledge.add(sentence):
+            return False
+        self.enqueue(sentence)
+        if self.stats is not None:
+            self.stats["sentences_added"] += 1
+        return True
+
+    def infer(self):
+        """
+        Runs inference over the worklist until no sentence changes.
+
+        Sentences whose cells are all mines or all safe have those cells
+        marked, which puts every sentence containing them back on the
+        worklist, and the resolved sentence is dropped. In "pairwise"
+        mode any other sentence is compared with its stored subsets and
+        supersets, and the difference of each pair is added as a new
+        sentence. In "linear" mode, once the worklist is empty,
+        linear_deductions is run over the components of the knowledge
+        base that changed, and inference repeats until it finds nothing
+        new.
+        """
+        self.drain_worklist()
+        while self.inference == "linear" and self.changed_cells:
+            changed = []
+            for component in constraint_components(list(self.knowledge)):
+                if any(sentence.cells & self.changed_cells
+                       for sentence in component):
+                    changed.extend(component)
+            self.changed_cells = set()
+            mines, safes = linear_deductions(changed)
+            if not mines and not safes:
+                break
+            if self.stats is not None:
+                self.stats["linear_mines"] += len(mines - self.mines)
+                self.stats["linear_safes"] += len(safes - self.safes)
+            for mine in mines:
+                self.mark_mine(mine)
+            for safe in safes:
+                self.mark_safe(safe)
+            self.drain_worklist()
+
+    def drain_worklist(self):
+        """
+        Processes sentences on the worklist until it is empty.
+        """
+        while self.pending:
+            sentence = self.pending.popleft()
+            self.pending_ids.discard(id(sentence))
+            if self.knowledge.get(sentence.cells) is not sentence:
+                continue
+            self.changed_cells.update(sentence.cells)
+
+            # Mark cells this sentence determines
+            mines = sentence.known_mines().copy()
+            safes = sentence.known_safes().copy()
+            if mines or safes:
+                self.knowledge.discard(sentence)
+                if self.stats is not None:
+                    self.stats["known_mines"] += len(mines)
+                    self.stats["known_safes"] += len(safes)
+                for mine in mines:
+                    self.mark_mine(mine)
+                for safe in safes:
+                    self.mark_safe(safe)
+                continue
+            if self.inference != "pairwise":
+                continue
+
+            # Infer new sentences from subset relations
+            inferred = 0
+            for other in self.knowledge.subsets(sentence):
+                inferred += self.add_sentence(Sentence(
+                    sentence.cells - other.cells, sentence.count - other.count
+                ))
+            for other in self.knowledge.supersets(sentence):
+                inferred += self.add_sentence(Sentence(
+                    other.cells - sentence.cells, other.count - sentence.count
+                ))
+            if self.stats is not None:
+                self.stats["subset_sentences"] += inferred
 
     def add_knowledge(self, cell, count):
         """
@@ -193,47 +812,23 @@ class MinesweeperAI():
             5) add any new sentences to the AI's knowledge base
                if they can be inferred from existing knowledge
         """
-        # print("add_knowledge")
+        if self.record_stats:
+            self.start_stats()
+
         ###### (1) ######
-        # print("add_knowledge 1")
         self.moves_made.add(cell)
+        self.remove_candidate(cell)
 
         ###### (2) ######
-        # print("add_knowledge 2")
         self.mark_safe(cell)
+        if self.stats is not None:
+            self.stats["time_mark"] = time.perf_counter()
 
         ###### (3) ######
-        # print("add_knowledge 3")
         # Find the neighbouring cells
         # (row_num, col_num)
-        neighbouring_cells = set()
-        row = cell[0]
-        col = cell[1]
-        
-        # Neighbours Above
-        if (row - 1 >= 0): # if cell is not at the top row
-            neighbouring_cells.add((row-1, col))
-
-            if (col-1 >= 0): # if neighbour cell diagonally above is not at the first column
-                neighbouring_cells.add((row-1, col-1))
-            if (col+1 <= self.width-1): # if neighbour cell diagonally above is not at the last column
-                neighbouring_cells.add((row-1, col+1))
-        
-        # Neighbours Either Side
-        if (col-1 >= 0): # if left neighbour cell is not at the first column
-            neighbouring_cells.add((row, col-1))
-        if (col+1 <= self.width-1): # if right neighbour cell is not at the last column
-            neighbouring_cells.add((row, col+1))
-
-        # Neighbours Below
-        if (row + 1 <= self.height - 1): # if cell is not at the last row
-            neighbouring_cells.add((row+1, col))
-
-            if (col-1 >= 0): # if neighbour diagonally below is not at the first column
-                neighbouring_cells.add((row+1, col-1))
-            if (col+1 <= self.width-1): # if neighbour diagonally below is not at the last column
-                neighbouring_cells.add((row+1, col+1))
-        
+        neighbouring_cells = set(self.neighbours[cell])
+
         num_mines_neighbours = count
         neighbours_to_remove = set()
         for neighbour in neighbouring_cells:
@@ -247,67 +842,70 @@ class MinesweeperAI():
 
         sentence = Sentence(neighbouring_cells, num_mines_neighbours) # create the sentence
         
-        # append sentence into knowledge base
-        self.knowledge.append(sentence)
-
-        ###### (4) ######
-        # print("add_knowledge 4")
-        # Obtain the additional mines and safes that can be concluded from the sentence
-        # sentence_mines = sentence.known_mines().copy() 
-        # sentence_safes = sentence.known_safes().copy()
-
-        # # mark the mines and safes
-        # for mine in sentence_mines:
-        #     self.mark_mine(mine)
-        # for safe in sentence_safes:
-        #     self.mark_safe(safe)
-        
-        ###### (5) ######
-        # print("add_knowledge 5")
-        # for sent in self.knowledge: # for each sentence in KB
-        #     for mine in self.mines: # for each known mine
-        #         sent.mark_mine(mine) # mark the mine in the sentence
-        #     for safe in self.safes: # for each known safe
-        #         sent.mark_safe(safe) # mark the safe in the sentence
-        #     sent_mines = sent.known_mines().copy() # obtain any new inferences about mines
-        #     sent_safes = sent.known_safes().copy() # obtain any new inferences about safes
-        #     for mine in sent_mines: # for each new known mines
-        #         self.mark_mine(mine) # mark the mine for all sentences
-        #     for safe in sent_safes: # for each new known safe
-        #         self.mark_safe(safe) # mark the safe for all sentences
-
-        # Mark cells as safe or mines based on updated knowledge base
-        mines_to_be_marked = []
-        safes_to_be_marked = []
-        for sent in self.knowledge:
-            for mine in sent.known_mines():
-                mines_to_be_marked.append(mine)
-            for safe in sent.known_safes():
-                safes_to_be_marked.append(safe)
-        for mine in mines_to_be_marked:
-            self.mark_mine(mine)
-        for safe in safes_to_be_marked:
-            self.mark_safe(safe)
-
-        # Update AI's knowledge base if there are any new inferences made
-        new_knowledge = []
-        for sent in self.knowledge:
-            if sentence.cells and sent.cells != sentence.cells: # if sentence is not empty and sentence is not sent
-                if sent.cells.issubset(sentence.cells): # if sent is a subset of sentence
-                    inferred_sent = Sentence(sentence.cells-sent.cells, max(sentence.count-sent.count, 0))
-                    new_knowledge.append(inferred_sent)
-                if sentence.cells.issubset(sent.cells): # if sentence is a subset of sent
-                    inferred_sent = Sentence(sent.cells-sentence.cells, max(sent.count-sentence.count,0))
-                    new_knowledge.append(inferred_sent)
-            
-        self.knowledge.extend(new_knowledge) # extend the new knowledge
-        # print("add_knowledge done")
-
-        # # print current knowledge base
-        # print("Number of sentenes in knowledge base: {}".format(len(self.knowledge)))
-        # for sentence in self.knowledge:
-        #     print("{} = {}".format(sentence.cells, sentence.count))
-                     
+        # add sentence into knowledge base
+        self.add_sentence(sentence)
+        if self.stats is not None:
+            self.stats["time_sentence"] = time.perf_counter()
+
+        ###### (4) and (5) ######
+        # Propagate new mines and safes, and infer new sentences,
+        # starting from the sentences that changed in this move
+        self.infer()
+        self.knowledge_sizes.append(len(self.knowledge))
+
+        if self.stats is not None:
+            self.finish_stats(cell, count)
+
+    def start_stats(self):
+        """
+        Starts the statistics record for a move.
+        """
+        self.stats = {
+            "time_start": time.perf_counter(),
+            "sentences_before": len(self.knowledge),
+            "sentences_added": 0,
+            "known_mines": 0,
+            "known_safes": 0,
+            "subset_sentences": 0,
+            "linear_mines": 0,
+            "linear_safes": 0,
+        }
+
+    def finish_stats(self, cell, count):
+        """
+        Completes the statistics record for a move and stores it in
+        self.move_stats.
+
+        Each record holds the seconds spent marking the clicked cell
+        safe, building its sentence and running inference; the number
+        of sentences and of cells they mention afterwards; how many
+        mines and safes each rule found and how many sentences subset
+        inference produced; and how many sentences were added to and
+        pruned from the knowledge base.
+        """
+        stats = self.stats
+        self.stats = None
+        end = time.perf_counter()
+        sentences = len(self.knowledge)
+        self.move_stats.append({
+            "cell": cell,
+            "count": count,
+            "time_mark": stats["time_mark"] - stats["time_start"],
+            "time_sentence": stats["time_sentence"] - stats["time_mark"],
+            "time_inference": end - stats["time_sentence"],
+            "time_total": end - stats["time_start"],
+            "sentences": sentences,
+            "cells": len(self.knowledge.index),
+            "known_mines": stats["known_mines"],
+            "known_safes": stats["known_safes"],
+            "subset_sentences": stats["subset_sentences"],
+            "linear_mines": stats["linear_mines"],
+            "linear_safes": stats["linear_safes"],
+            "sentences_added": stats["sentences_added"],
+            "sentences_pruned": (stats["sentences_before"]
+                                 + stats["sentences_added"] - sentences),
+        })
+
     def make_safe_move(self):
         """
         Returns a safe cell to choose on the Minesweeper board.
@@ -317,11 +915,11 @@ class MinesweeperAI():
         This function may use the knowledge in self.mines, self.safes
         and self.moves_made, but should not modify any of those values.
         """
-        # print("make_safe_move")
-        for safe in self.safes: # for each safe cell
-            if safe not in self.moves_made: # if move has not been made on the safe cell
-                # print("safe move:", safe)
-                return safe # return safe cell to be the next move
+        # Drop safe cells that have been chosen since they were found
+        while self.safe_moves and self.safe_moves[0] in self.moves_made:
+            self.safe_moves.popleft()
+        if self.safe_moves:
+            return self.safe_moves[0]
         return None # if there are no safe cells available to move to, return a random move
 
     def make_random_move(self):
@@ -332,13 +930,147 @@ class MinesweeperAI():
             2) are not known to be mines
         """
         # print("make_random_move")
-        all_moves = set() # all moves/cells
-        for row in range(0,8):
-            for col in range(0,8):
-                move = (row, col)
-                all_moves.add(move)
-        all_moves = all_moves - self.moves_made - self.mines # from set of all moves, remove moves that have been made or are mines
-        if len(all_moves) == 0:
+        if not self.candidates: # no cells left that are unchosen and not mines
             return None
         else:
-            return random.choice(list(all_moves))
\ No newline at end of file
+            return random.choice(self.candidates)
+
+    def solve_component(self, sentences):
+        """
+        Returns count_configurations for a component, memoized on the
+        component's sentences.
+        """
+        key = frozenset(
+            (frozenset(sentence.cells), sentence.count)
+            for sentence in sentences
+        )
+        if key not in self.component_cache:
+            if len(self.component_cache) > 10000:
+                self.component_cache.clear()
+            self.component_cache[key] = count_configurations(sentences)
+        return self.component_cache[key]
+
+    def mine_probabilities(self):
+        """
+        Returns a dict mapping every cell that has not been chosen and is
+        not known to be a mine to the probability that it is a mine.
+
+        Each independent component of the frontier is solved separately.
+        If the total number of mines is known, configurations of the
+        whole board are weighted by the ways to place the remaining
+        mines in cells no sentence mentions. Cells of a component for
+        which no configuration was found in time get the average of
+        count / size over the sentences that mention them, and their
+        expected mines are set aside from the remaining total.
+        """
+        unknown = set(self.candidates)
+        probabilities = {cell: 0 for cell in unknown & self.safes}
+
+        solved = []
+        unsolved = []
+        for component in constraint_components(list(self.knowledge)):
+            result = self.solve_component(component)
+            if result[1]:
+                solved.append(result)
+            else:
+                unsolved.extend(component)
+        estimates = local_estimates(unsolved)
+        probabilities.update(estimates)
+        frontier = set(cell for cells, _, _ in solved for cell in cells)
+        frontier.update(estimates)
+        interior = unknown - frontier - self.safes
+
+        # Without a mine total, components are independent
+        if self.total_mines is None:
+            for cells, weights, cell_weights in solved:
+                total = sum(weights.values())
+                for i, cell in enumerate(cells):
+                    mines = sum(row[i] for row in cell_weights.values())
+                    probabilities[cell] = mines / total
+            density = (sum(probabilities[cell] for cell in frontier)
+                       / len(frontier) if frontier else 0.5)
+            for cell in interior:
+                probabilities[cell] = density
+            return probabilities
+
+        remaining = (self.total_mines - len(self.mines)
+                     - round(sum(estimates.values())))
+
+        def convolve(a, b):
+            result = dict()
+            for i, x in a.items():
+                for j, y in b.items():
+                    result[i + j] = result.get(i + j, 0) + x * y
+            return result
+
+        def interior_ways(mines, cells):
+            if mines < 0 or mines > cells:
+                return 0
+            return math.comb(cells, mines)
+
+        # before[i] and after[i] combine the components before and after
+        # the i-th, so each component's complement takes one convolution
+        before = [{0: 1}]
+        for _, weights, _ in solved:
+            before.append(convolve(before[-1], weights))
+        after = [{0: 1}]
+        for _, weights, _ in reversed(solved):
+            after.append(convolve(after[-1], weights))
+        after.reverse()
+
+        # Ways to complete the board given the frontier holds k mines
+        everything = before[-1]
+        total = sum(ways * interior_ways(remaining - k, len(interior))
+                    for k, ways in everything.items())
+        if total == 0:
+            return self.mine_probabilities_without_total()
+
+        for index, (cells, weights, cell_weights) in enumerate(solved):
+            others = convolve(before[index], after[index + 1])
+            completions = dict()
+            for k in weights:
+                completions[k] = sum(
+                    ways * interior_ways(remaining - k - j, len(interior))
+                    for j, ways in others.items()
+                )
+            for i, cell in enumerate(cells):
+                probabilities[cell] = sum(
+                    cell_weights[k][i] * completions[k] for k in weights
+                ) / total
+
+        if interior:
+            expected = sum(
+                ways * interior_ways(remaining - k, len(interior))
+                * (remaining - k)
+                for k, ways in everything.items()
+            ) / total
+            for cell in interior:
+                probabilities[cell] = expected / len(interior)
+        return probabilities
+
+    def mine_probabilities_without_total(self):
+        """
+        Returns mine_probabilities ignoring the total mine count, for when
+        the count is inconsistent with approximate component counts.
+        """
+        total_mines = self.total_mines
+        self.total_mines = None
+        try:
+            return self.mine_probabilities()
+        finally:
+            self.total_mines = total_mines
+
+    def make_guess_move(self):
+        """
+        Returns the cell least likely to be a mine among cells that
+        have not already been chosen and are not known to be mines,
+        or None if there are no such cells.
+        """
+        probabilities = self.mine_probabilities()
+        if not probabilities:
+            return None
+        lowest = min(probabilities.values())
+        return random.choice(sorted(
+            cell for cell, probability in probabilities.items()
+            if probability == lowest
+        ))
@@ -1,13 +1,15 @@
 import pygame
 import sys
-import time
 
-from minesweeper import Minesweeper, MinesweeperAI
+from minesweeper import ArrayMinesweeper, MinesweeperAI
 
 HEIGHT = 8
 WIDTH = 8
 MINES = 8
 
+# Frames per second while there is something to redraw
+FPS = 30
+
 # Colors
 BLACK = (0, 0, 0)
 GRAY = (180, 180, 180)
@@ -37,186 +39,258 @@ flag = pygame.transform.scale(flag, (cell_size, cell_size))
 mine = pygame.image.load("assets/images/mine.png")
 mine = pygame.transform.scale(mine, (cell_size, cell_size))
 
-# Create game and AI agent
-game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
-ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
+# Rectangles for every cell, buttons and the status text never move
+cells = [
+    [
+        pygame.Rect(
+            board_origin[0] + j * cell_size,
+            board_origin[1] + i * cell_size,
+            cell_size, cell_size
+        )
+        for j in range(WIDTH)
+    ]
+    for i in range(HEIGHT)
+]
+aiButton = pygame.Rect(
+    (2 / 3) * width + BOARD_PADDING, (1 / 3) * height - 50,
+    (width / 3) - BOARD_PADDING * 2, 50
+)
+resetButton = pygame.Rect(
+    (2 / 3) * width + BOARD_PADDING, (1 / 3) * height + 20,
+    (width / 3) - BOARD_PADDING * 2, 50
+)
+playButton = pygame.Rect((width / 4), (3 / 4) * height, width / 2, 50)
+statusRect = pygame.Rect(
+    (2 / 3) * width + BOARD_PADDING, (2 / 3) * height - 25,
+    (width / 3) - BOARD_PADDING * 2, 50
+)
+
+
+def draw_instructions():
+    """
+    Draws the instructions screen.
+    """
+    screen.fill(BLACK)
 
-# Keep track of revealed cells, flagged cells, and if a mine was hit
-revealed = set()
-flags = set()
-lost = False
+    # Title
+    title = largeFont.render("Play Minesweeper", True, WHITE)
+    titleRect = title.get_rect()
+    titleRect.center = ((width / 2), 50)
+    screen.blit(title, titleRect)
+
+    # Rules
+    rules = [
+        "Click a cell to reveal it.",
+        "Right-click a cell to mark it as a mine.",
+        "Mark all mines successfully to win!"
+    ]
+    for i, rule in enumerate(rules):
+        line = smallFont.render(rule, True, WHITE)
+        lineRect = line.get_rect()
+        lineRect.center = ((width / 2), 150 + 30 * i)
+        screen.blit(line, lineRect)
+
+    # Play game button
+    draw_button(playButton, "Play Game")
+
+
+def draw_button(rect, label):
+    """
+    Draws a button with a centered label.
+    """
+    buttonText = mediumFont.render(label, True, BLACK)
+    buttonRect = buttonText.get_rect()
+    buttonRect.center = rect.center
+    pygame.draw.rect(screen, WHITE, rect)
+    screen.blit(buttonText, buttonRect)
 
-# Show instructions initially
-instructions = True
 
-while True:
+def draw_cell(cell):
+    """
+    Draws one cell of the board. Returns its rectangle.
+    """
+    i, j = cell
+    rect = cells[i][j]
+    pygame.draw.rect(screen, GRAY, rect)
+    pygame.draw.rect(screen, WHITE, rect, 3)
+
+    # Add a mine, flag, or number if needed
+    if game.is_mine(cell) and lost:
+        screen.blit(mine, rect)
+    elif cell in flags:
+        screen.blit(flag, rect)
+    elif cell in revealed:
+        neighbors = smallFont.render(
+            str(game.nearby_mines(cell)),
+            True, BLACK
+        )
+        neighborsTextRect = neighbors.get_rect()
+        neighborsTextRect.center = rect.center
+        screen.blit(neighbors, neighborsTextRect)
+    return rect
+
+
+def draw_status():
+    """
+    Draws the won or lost text. Returns its rectangle.
+    """
+    pygame.draw.rect(screen, BLACK, statusRect)
+    text = "Lost" if lost else "Won" if game.mines == flags else ""
+    text = mediumFont.render(text, True, WHITE)
+    textRect = text.get_rect()
+    textRect.center = ((5 / 6) * width, (2 / 3) * height)
+    screen.blit(text, textRect)
+    return statusRect
 
-    # Check if game quit
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            sys.exit()
 
+def draw_game():
+    """
+    Draws the whole game screen.
+    """
     screen.fill(BLACK)
+    for i in range(HEIGHT):
+        for j in range(WIDTH):
+            draw_cell((i, j))
+    draw_button(aiButton, "AI Move")
+    draw_button(resetButton, "Reset")
+    draw_status()
+
+
+def cell_at(position):
+    """
+    Returns the board cell at a screen position, or None.
+    """
+    x, y = position
+    i = (y - board_origin[1]) // cell_size
+    j = (x - board_origin[0]) // cell_size
+    if 0 <= i < HEIGHT and 0 <= j < WIDTH:
+        return (i, j)
+    return None
+
+
+def new_game():
+    """
+    Returns a new game, AI agent and empty revealed and flagged sets.
+    """
+    return (
+        ArrayMinesweeper(height=HEIGHT, width=WIDTH, mines=MINES),
+        MinesweeperAI(height=HEIGHT, width=WIDTH, mines=MINES),
+        set(),
+        set()
+    )
 
-    # Show game instructions
-    if instructions:
-
-        # Title
-        title = largeFont.render("Play Minesweeper", True, WHITE)
-        titleRect = title.get_rect()
-        titleRect.center = ((width / 2), 50)
-        screen.blit(title, titleRect)
-
-        # Rules
-        rules = [
-            "Click a cell to reveal it.",
-            "Right-click a cell to mark it as a mine.",
-            "Mark all mines successfully to win!"
-        ]
-        for i, rule in enumerate(rules):
-            line = smallFont.render(rule, True, WHITE)
-            lineRect = line.get_rect()
-            lineRect.center = ((width / 2), 150 + 30 * i)
-            screen.blit(line, lineRect)
-
-        # Play game button
-        buttonRect = pygame.Rect((width / 4), (3 / 4) * height, width / 2, 50)
-        buttonText = mediumFont.render("Play Game", True, BLACK)
-        buttonTextRect = buttonText.get_rect()
-        buttonTextRect.center = buttonRect.center
-        pygame.draw.rect(screen, WHITE, buttonRect)
-        screen.blit(buttonText, buttonTextRect)
 
-        # Check if play button clicked
-        click, _, _ = pygame.mouse.get_pressed()
-        if click == 1:
-            mouse = pygame.mouse.get_pos()
-            if buttonRect.collidepoint(mouse):
-                instructions = False
-                time.sleep(0.3)
+# Create game and AI agent, and keep track of revealed cells,
+# flagged cells, and if a mine was hit
+game, ai, revealed, flags = new_game()
+lost = False
 
-        pygame.display.flip()
-        continue
+# Show instructions initially
+instructions = True
 
-    # Draw board
-    cells = []
-    for i in range(HEIGHT):
-        row = []
-        for j in range(WIDTH):
+# Cells and regions that need redrawing, or the whole screen
+dirty_cells = set()
+dirty_status = False
+redraw_all = True
 
-            # Draw rectangle for cell
-            rect = pygame.Rect(
-                board_origin[0] + j * cell_size,
-                board_origin[1] + i * cell_size,
-                cell_size, cell_size
-            )
-            pygame.draw.rect(screen, GRAY, rect)
-            pygame.draw.rect(screen, WHITE, rect, 3)
-
-            # Add a mine, flag, or number if needed
-            if game.is_mine((i, j)) and lost:
-                screen.blit(mine, rect)
-            elif (i, j) in flags:
-                screen.blit(flag, rect)
-            elif (i, j) in revealed:
-                neighbors = smallFont.render(
-                    str(game.nearby_mines((i, j))),
-                    True, BLACK
-                )
-                neighborsTextRect = neighbors.get_rect()
-                neighborsTextRect.center = rect.center
-                screen.blit(neighbors, neighborsTextRect)
-
-            row.append(rect)
-        cells.append(row)
-
-    # AI Move button
-    aiButton = pygame.Rect(
-        (2 / 3) * width + BOARD_PADDING, (1 / 3) * height - 50,
-        (width / 3) - BOARD_PADDING * 2, 50
-    )
-    buttonText = mediumFont.render("AI Move", True, BLACK)
-    buttonRect = buttonText.get_rect()
-    buttonRect.center = aiButton.center
-    pygame.draw.rect(screen, WHITE, aiButton)
-    screen.blit(buttonText, buttonRect)
+clock = pygame.time.Clock()
 
-    # Reset button
-    resetButton = pygame.Rect(
-        (2 / 3) * width + BOARD_PADDING, (1 / 3) * height + 20,
-        (width / 3) - BOARD_PADDING * 2, 50
-    )
-    buttonText = mediumFont.render("Reset", True, BLACK)
-    buttonRect = buttonText.get_rect()
-    buttonRect.center = resetButton.center
-    pygame.draw.rect(screen, WHITE, resetButton)
-    screen.blit(buttonText, buttonRect)
+while True:
 
-    # Display text
-    text = "Lost" if lost else "Won" if game.mines == flags else ""
-    text = mediumFont.render(text, True, WHITE)
-    textRect = text.get_rect()
-    textRect.center = ((5 / 6) * width, (2 / 3) * height)
-    screen.blit(text, textRect)
+    # Sleep until the next event when there is nothing to redraw
+    events = pygame.event.get()
+    if not events and not redraw_all and not dirty_cells and not dirty_status:
+        events = [pygame.event.wait()]
+
+    for event in events:
+
+        # Check if game quit
+        if event.type == pygame.QUIT:
+            sys.exit()
+        if event.type != pygame.MOUSEBUTTONDOWN:
+            continue
+        mouse = event.pos
 
-    move = None
+        # Check if play button clicked
+        if instructions:
+            if event.button == 1 and playButton.collidepoint(mouse):
+                instructions = False
+                redraw_all = True
+            continue
 
-    left, _, right = pygame.mouse.get_pressed()
+        move = None
 
-    # Check for a right-click to toggle flagging
-    if right == 1 and not lost:
-        mouse = pygame.mouse.get_pos()
-        for i in range(HEIGHT):
-            for j in range(WIDTH):
-                if cells[i][j].collidepoint(mouse) and (i, j) not in revealed:
-                    if (i, j) in flags:
-                        flags.remove((i, j))
-                    else:
-                        flags.add((i, j))
-                    time.sleep(0.2)
+        # Check for a right-click to toggle flagging
+        if event.button == 3 and not lost:
+            cell = cell_at(mouse)
+            if cell is not None and cell not in revealed:
+                if cell in flags:
+                    flags.remove(cell)
+                else:
+                    flags.add(cell)
+                dirty_cells.add(cell)
+                dirty_status = True
 
-    elif left == 1:
-        mouse = pygame.mouse.get_pos()
+        elif event.button == 1:
 
-        # If AI button clicked, make an AI move
-        if aiButton.collidepoint(mouse) and not lost:
-            move = ai.make_safe_move()
-            if move is None:
-                move = ai.make_random_move()
+            # If AI button clicked, make an AI move
+            if aiButton.collidepoint(mouse) and not lost:
+                move = ai.make_safe_move()
                 if move is None:
-                    flags = ai.mines.copy()
-                    print("No moves left to make.")
+                    move = ai.make_guess_move()
+                    if move is None:
+                        dirty_cells |= flags ^ ai.mines
+                        dirty_status = True
+                        flags = ai.mines.copy()
+                        print("No moves left to make.")
+                    else:
+                        print("No known safe moves, AI making best guess.")
                 else:
-                    print("No known safe moves, AI making random move.")
+                    print("AI making safe move.")
+
+            # Reset game state
+            elif resetButton.collidepoint(mouse):
+                game, ai, revealed, flags = new_game()
+                lost = False
+                redraw_all = True
+                continue
+
+            # User-made move
+            elif not lost:
+                cell = cell_at(mouse)
+                if (cell is not None
+                        and cell not in flags
+                        and cell not in revealed):
+                    move = cell
+
+        # Make move and update AI knowledge
+        if move:
+            if game.is_mine(move):
+                lost = True
+                dirty_cells |= game.mines
+                dirty_status = True
             else:
-                print("AI making safe move.")
-            time.sleep(0.2)
-
-        # Reset game state
-        elif resetButton.collidepoint(mouse):
-            game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
-            ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
-            revealed = set()
-            flags = set()
-            lost = False
-            continue
-
-        # User-made move
-        elif not lost:
-            for i in range(HEIGHT):
-                for j in range(WIDTH):
-                    if (cells[i][j].collidepoint(mouse)
-                            and (i, j) not in flags
-                            and (i, j) not in revealed):
-                        move = (i, j)
-
-    # Make move and update AI knowledge
-    if move:
-        if game.is_mine(move):
-            lost = True
+                # Reveal the cell, and the whole region if it has no nearby mines
+                for cell in game.reveal(move) - revealed - flags:
+                    nearby = game.nearby_mines(cell)
+                    revealed.add(cell)
+                    ai.add_knowledge(cell, nearby)
+                    dirty_cells.add(cell)
+
+    # Redraw only what changed
+    if redraw_all:
+        if instructions:
+            draw_instructions()
         else:
-            nearby = game.nearby_mines(move)
-            revealed.add(move)
-            ai.add_knowledge(move, nearby)
-
-    pygame.display.flip()
+            draw_game()
+        pygame.display.flip()
+    elif not instructions and (dirty_cells or dirty_status):
+        rects = [draw_cell(cell) for cell in dirty_cells]
+        if dirty_status:
+            rects.append(draw_status())
+        pygame.display.update(rects)
+    redraw_all = False
+    dirty_cells = set()
+    dirty_status = False
+
+    clock.tick(FPS)
@@ -0,0 +1,179 @@
+import argparse
+import multiprocessing
+import random
+import time
+
+from minesweeper import ArrayMinesweeper, Minesweeper, MinesweeperAI
+
+
+def play_game(config):
+    """
+    Plays one headless game of Minesweeper with the AI.
+
+    `config` is a dict with the board size, mine count, board type,
+    whether zero regions are flood-revealed, inference mode, guess
+    strategy, whether to record the AI's per-move statistics and the
+    game's seed. Returns a dict describing the game: whether it was won,
+    moves and guesses made, the time in seconds each call to
+    add_knowledge took and the AI's per-move statistics records.
+    """
+    random.seed(config["seed"])
+    height, width = config["height"], config["width"]
+    board = ArrayMinesweeper if config["board"] == "array" else Minesweeper
+    game = board(height=height, width=width, mines=config["mines"])
+    ai = MinesweeperAI(height=height, width=width, mines=config["mines"],
+                       inference=config["inference"],
+                       record_stats=config["stats"])
+
+    revealed = set()
+    moves = 0
+    guesses = 0
+    latencies = []
+    won = False
+    while True:
+        move = ai.make_safe_move()
+        if move is None:
+            if config["guess"] == "random":
+                move = ai.make_random_move()
+            else:
+                move = ai.make_guess_move()
+            if move is None:
+                won = True
+                break
+            guesses += 1
+        if game.is_mine(move):
+            break
+
+        moves += 1
+        cells = game.reveal(move) if config["flood"] else {move}
+        for cell in sorted(cells - revealed):
+            revealed.add(cell)
+            start = time.perf_counter()
+            ai.add_knowledge(cell, game.nearby_mines(cell))
+            latencies.append(time.perf_counter() - start)
+
+        # The game is won once every safe cell has been revealed
+        if len(revealed) == height * width - config["mines"]:
+            won = True
+            break
+
+    return {
+        "seed": config["seed"],
+        "won": won,
+        "moves": moves,
+        "guesses": guesses,
+        "latencies": latencies,
+        "stats": ai.move_stats,
+    }
+
+
+def percentile(values, fraction):
+    """
+    Returns the value below which `fraction` of sorted `values` fall.
+    """
+    if not values:
+        return 0
+    index = min(int(fraction * len(values)), len(values) - 1)
+    return values[index]
+
+
+def simulate(games=1000, height=8, width=8, mines=8, seed=0,
+             board="list", flood=False, inference="pairwise", guess="best",
+             stats=False, processes=None):
+    """
+    Plays `games` games across a process pool and summarizes them.
+
+    Game i is seeded with seed + i, so a run is reproducible for a given
+    seed however the games are spread over processes.
+    """
+    configs = [{
+        "height": height,
+        "width": width,
+        "mines": mines,
+        "board": board,
+        "flood": flood,
+        "inference": inference,
+        "guess": guess,
+        "stats": stats,
+        "seed": seed + i,
+    } for i in range(games)]
+
+    with multiprocessing.Pool(processes) as pool:
+        results = pool.map(play_game, configs, chunksize=16)
+
+    latencies = sorted(
+        latency for result in results for latency in result["latencies"]
+    )
+
+    # Average every numeric statistic over all recorded moves
+    records = [record for result in results for record in result["stats"]]
+    move_stats = dict()
+    if records:
+        for key, value in records[0].items():
+            if isinstance(value, (int, float)) and key != "count":
+                move_stats[key] = (sum(record[key] for record in records)
+                                   / len(records))
+
+    return {
+        "games": games,
+        "win_rate": sum(result["won"] for result in results) / games,
+        "average_moves": sum(result["moves"] for result in results) / games,
+        "guesses_per_game": (sum(result["guesses"] for result in results)
+                             / games),
+        "latency_p50": percentile(latencies, 0.5),
+        "latency_p90": percentile(latencies, 0.9),
+        "latency_p99": percentile(latencies, 0.99),
+        "latency_max": latencies[-1] if latencies else 0,
+        "move_stats": move_stats,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Play Minesweeper games headlessly with the AI."
+    )
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--height", type=int, default=8)
+    parser.add_argument("--width", type=int, default=8)
+    parser.add_argument("--mines", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--board", choices=["list", "array"],
+                        default="list")
+    parser.add_argument("--flood", action="store_true",
+                        help="reveal regions with no nearby mines at once")
+    parser.add_argument("--inference", choices=["pairwise", "linear"],
+                        default="pairwise")
+    parser.add_argument("--guess", choices=["best", "random"],
+                        default="best")
+    parser.add_argument("--stats", action="store_true",
+                        help="record and average per-move AI statistics")
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+
+    summary = simulate(
+        games=args.games, height=args.height, width=args.width,
+        mines=args.mines, seed=args.seed, board=args.board,
+        flood=args.flood, inference=args.inference,
+        guess=args.guess, stats=args.stats, processes=args.processes
+    )
+    print(f"Games: {summary['games']}")
+    print(f"Win rate: {summary['win_rate']:.2%}")
+    print(f"Average moves: {summary['average_moves']:.1f}")
+    print(f"Guesses per game: {summary['guesses_per_game']:.2f}")
+    print("Inference latency per move (ms): "
+          f"p50 {summary['latency_p50'] * 1000:.3f}, "
+          f"p90 {summary['latency_p90'] * 1000:.3f}, "
+          f"p99 {summary['latency_p99'] * 1000:.3f}, "
+          f"max {summary['latency_max'] * 1000:.3f}")
+    if summary["move_stats"]:
+        print("Average per move:")
+        for key, value in summary["move_stats"].items():
+            if key.startswith("time_"):
+                print(f"  {key}: {value * 1000:.4f} ms")
+            else:
+                print(f"  {key}: {value:.3f}")
+
+
+if __name__ == "__main__":
+    main()
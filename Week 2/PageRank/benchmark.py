@@ -0,0 +1,51 @@
+import sys
+import time
+
+import numpy as np
+
+from pagerank import DAMPING, SOLVERS, TransitionMatrix, crawl
+
+TOLERANCE = 1e-10
+MAX_ITERATIONS = 10000
+
+
+def benchmark(corpus, damping_factor=DAMPING, solvers=None,
+              tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS):
+    """
+    Solves a corpus with every solver to the same L1 tolerance.
+    Returns a list of (solver name, iterations, seconds, L1 distance
+    from the first solver's result) results.
+    """
+    if solvers is None:
+        solvers = list(SOLVERS)
+    matrix = TransitionMatrix.from_corpus(corpus)
+    results = []
+    expected = None
+    for name in solvers:
+        start = time.perf_counter()
+        rank, iterations = SOLVERS[name](matrix, damping_factor, tolerance,
+                                         max_iterations)
+        elapsed = time.perf_counter() - start
+        if expected is None:
+            expected = rank
+        results.append((name, iterations, elapsed,
+                        np.abs(rank - expected).sum()))
+    return results
+
+
+def main():
+    if len(sys.argv) not in [2, 3]:
+        sys.exit("Usage: python benchmark.py corpus [solvers]")
+    solvers = sys.argv[2].split(",") if len(sys.argv) == 3 else None
+    for name in solvers or []:
+        if name not in SOLVERS:
+            sys.exit(f"Unknown solver {name}, choose from {', '.join(SOLVERS)}")
+    corpus = crawl(sys.argv[1])
+    print(f"{len(corpus)} pages, damping {DAMPING}, L1 tolerance {TOLERANCE}")
+    print(f"{'solver':<15} {'iterations':>10} {'seconds':>10} {'L1 diff':>10}")
+    for name, iterations, elapsed, diff in benchmark(corpus, solvers=solvers):
+        print(f"{name:<15} {iterations:>10} {elapsed:>10.4f} {diff:>10.2e}")
+
+
+if __name__ == "__main__":
+    main()
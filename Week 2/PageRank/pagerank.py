@@ -1,13 +1,47 @@
+import json
 import os
 import random
 import re
 import sys
+from collections import deque
+from statistics import NormalDist
 import numpy as np
 import math
+from concurrent.futures import ProcessPoolExecutor
 
 DAMPING = 0.85
 SAMPLES = 10000
 
+LINK_PATTERN = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+# Name of the link cache cached_crawl keeps in a corpus directory
+CRAWL_INDEX = ".crawl_index.json"
+
+# Fewer changed files than this are parsed without a process pool
+PARALLEL_CRAWL_THRESHOLD = 64
+
+# Files of a graph stored on disk: page names, one per line, the
+# in-link CSR arrays of a TransitionMatrix and the targets of its
+# out-link CSR, whose offsets follow from the out-degrees
+GRAPH_PAGES = "pages.txt"
+GRAPH_INDPTR = "indptr.npy"
+GRAPH_INDICES = "indices.npy"
+GRAPH_OUT_DEGREE = "out_degree.npy"
+GRAPH_OUT_TARGETS = "out_targets.npy"
+
+# Number of links a MappedTransitionMatrix reads from disk at a time
+MAPPED_BLOCK_SIZE = 1 << 22
+
+# Sampling parameters of a worker process, set by start_sampler
+sampler = None
+
+# Consecutive iterations a page must change by less than tolerance / N
+# before adaptive_pagerank stops recomputing it
+FREEZE_ITERATIONS = 3
+
+# Iterations between adaptive_pagerank's sweeps over every page
+FULL_SWEEP_INTERVAL = 10
+
 
 def main():
     if len(sys.argv) != 2:
@@ -35,10 +69,8 @@ def crawl(directory):
     for filename in os.listdir(directory):
         if not filename.endswith(".html"):
             continue
-        with open(os.path.join(directory, filename)) as f:
-            contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
-            pages[filename] = set(links) - {filename}
+        links = extract_links(os.path.join(directory, filename))
+        pages[filename] = set(links) - {filename}
 
     # Only include links to other pages in the corpus
     for filename in pages:
@@ -50,6 +82,98 @@ def crawl(directory):
     return pages
 
 
+def extract_links(path):
+    """
+    Return the sorted list of distinct link targets in an HTML file.
+    """
+    with open(path) as f:
+        contents = f.read()
+    return sorted(set(LINK_PATTERN.findall(contents)))
+
+
+def cached_crawl(directory, index_path=None, workers=None):
+    """
+    Parse a directory of HTML pages like `crawl`, reusing cached links.
+
+    The links of every file are cached in a JSON index, by default
+    CRAWL_INDEX inside the directory, keyed by the file's absolute path
+    together with its size and modification time, so one index may be
+    shared by several directories. Only new or changed files are read
+    again; when there are many, they are parsed across a process pool.
+    Files are read one at a time, so the corpus never has to fit in
+    memory, only its links.
+    """
+    directory = os.path.abspath(directory)
+    if index_path is None:
+        index_path = os.path.join(directory, CRAWL_INDEX)
+    try:
+        with open(index_path) as f:
+            index = json.load(f)
+    except (FileNotFoundError, ValueError):
+        index = dict()
+
+    # Find files that are new or have changed since they were cached
+    entries = dict()
+    stale = []
+    with os.scandir(directory) as scan:
+        for entry in scan:
+            if not entry.name.endswith(".html") or not entry.is_file():
+                continue
+            stat = entry.stat()
+            cached = index.get(os.path.join(directory, entry.name))
+            if (cached is not None and cached["size"] == stat.st_size
+                    and cached["mtime"] == stat.st_mtime_ns):
+                entries[entry.name] = cached
+            else:
+                entries[entry.name] = {
+                    "size": stat.st_size,
+                    "mtime": stat.st_mtime_ns,
+                }
+                stale.append(entry.name)
+
+    # Extract links from stale files, in parallel if there are many
+    paths = [os.path.join(directory, filename) for filename in stale]
+    if len(paths) < PARALLEL_CRAWL_THRESHOLD:
+        results = map(extract_links, paths)
+    else:
+        workers = workers or os.cpu_count() or 1
+        executor = ProcessPoolExecutor(workers)
+        chunksize = max(1, len(paths) // (4 * workers))
+        results = executor.map(extract_links, paths, chunksize=chunksize)
+    try:
+        for filename, links in zip(stale, results):
+            entries[filename]["links"] = links
+    finally:
+        if len(paths) >= PARALLEL_CRAWL_THRESHOLD:
+            executor.shutdown()
+
+    # Save the index with other directories' entries kept, replacing
+    # the old one only once fully written
+    saved = {
+        path: cached for path, cached in index.items()
+        if os.path.isabs(path) and os.path.dirname(path) != directory
+    }
+    removed = len(index) - len(saved) != len(entries)
+    saved.update(
+        (os.path.join(directory, filename), entry)
+        for filename, entry in entries.items()
+    )
+    if stale or removed:
+        temporary = index_path + ".tmp"
+        with open(temporary, "w") as f:
+            json.dump(saved, f)
+        os.replace(temporary, index_path)
+
+    # Only include links to other pages in the corpus
+    pages = dict()
+    for filename, entry in entries.items():
+        pages[filename] = set(
+            link for link in entry["links"]
+            if link in entries and link != filename
+        )
+    return pages
+
+
 def transition_model(corpus, page, damping_factor):
     """
     Return a probability distribution over which page to visit next,
@@ -115,7 +239,8 @@ def sample_pagerank(corpus, damping_factor, n):
     
     return output_dict
 
-def iterate_pagerank(corpus, damping_factor):
+def iterate_pagerank(corpus, damping_factor, solver=None, tolerance=None,
+                     max_iterations=None):
     """
     Return PageRank values for each page by iteratively updating
     PageRank values until convergence.
@@ -123,7 +248,22 @@ def iterate_pagerank(corpus, damping_factor):
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
+
+    If any of `solver`, `tolerance` or `max_iterations` is given, solve
+    with the named one of SOLVERS, "jacobi" by default, stopping once
+    the L1 change in an iteration falls below `tolerance` (default
+    1e-10) or after `max_iterations` iterations (default 1000).
+    Otherwise iterate until no value changes by more than 0.001.
     """         
+    if (solver, tolerance, max_iterations) != (None, None, None):
+        matrix = TransitionMatrix.from_corpus(corpus)
+        rank, _ = SOLVERS[solver or "jacobi"](
+            matrix, damping_factor,
+            1e-10 if tolerance is None else tolerance,
+            1000 if max_iterations is None else max_iterations
+        )
+        return matrix.to_dict(rank)
+
     # Initialization
     N = len(corpus.keys())
     curr_dict = {} # key: page, value: page rank of the key
@@ -159,5 +299,911 @@ def iterate_pagerank(corpus, damping_factor):
         error = max(abs(np.array(list(next_dict.values())) - np.array(list(curr_dict.values()))))
     return next_dict
 
+
+
+class TransitionMatrix():
+    """
+    Link structure of a corpus as a compressed sparse row (CSR) matrix.
+
+    Row p lists the pages linking to page p: their indices are
+    `indices[indptr[p]:indptr[p + 1]]`. Pages are numbered in the order
+    of `pages`. Pages with no outgoing links are dangling and are
+    treated as linking to every page in the corpus, themselves included.
+    """
+
+    def __init__(self, pages, indptr, indices, out_degree):
+        self.pages = pages
+        self.index = {page: i for i, page in enumerate(pages)}
+        self.indptr = indptr
+        self.indices = indices
+        self.out_degree = out_degree
+        self.dangling = out_degree == 0
+
+        # Target row of every edge, so rows can be summed in one call
+        self.rows = np.repeat(np.arange(len(pages)), np.diff(indptr))
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Builds the matrix for a corpus dictionary mapping each page
+        to the set of pages it links to.
+        """
+        pages = list(corpus.keys())
+        index = {page: i for i, page in enumerate(pages)}
+        sources = []
+        targets = []
+        for page, links in corpus.items():
+            source = index[page]
+            for link in links:
+                sources.append(source)
+                targets.append(index[link])
+        sources = np.array(sources, dtype=np.int64)
+        targets = np.array(targets, dtype=np.int64)
+        return cls.from_edges(pages, sources, targets)
+
+    @classmethod
+    def from_edges(cls, pages, sources, targets):
+        """
+        Builds the matrix from parallel arrays of edge endpoints,
+        given as indices into `pages`.
+        """
+        n = len(pages)
+        order = np.argsort(targets, kind="stable")
+        indices = sources[order]
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(targets, minlength=n), out=indptr[1:])
+        out_degree = np.bincount(sources, minlength=n)
+        return cls(pages, indptr, indices, out_degree)
+
+    def __len__(self):
+        return len(self.pages)
+
+    def multiply(self, rank):
+        """
+        Returns, for each page, the sum over pages q linking to it
+        of rank[q] divided by the number of links on q. `rank` may also
+        be a matrix with one rank vector per column.
+        """
+        if rank.ndim == 1:
+            share = np.divide(rank, self.out_degree,
+                              out=np.zeros_like(rank), where=~self.dangling)
+            return np.bincount(self.rows, weights=share[self.indices],
+                               minlength=len(self.pages))
+
+        degree = np.maximum(self.out_degree, 1)[:, np.newaxis]
+        share = np.where(self.dangling[:, np.newaxis], 0, rank / degree)
+        result = np.zeros_like(rank)
+        linked = np.flatnonzero(np.diff(self.indptr))
+        if len(linked):
+            result[linked] = np.add.reduceat(share[self.indices],
+                                             self.indptr[linked], axis=0)
+        return result
+
+    def step(self, rank, damping_factor):
+        """
+        Applies the PageRank formula once to a rank vector.
+        """
+        n = len(self.pages)
+        dangling_rank = rank[self.dangling].sum()
+        return ((1 - damping_factor) / n
+                + damping_factor * (self.multiply(rank) + dangling_rank / n))
+
+    def outgoing(self):
+        """
+        Returns the outgoing links as CSR arrays (out_indptr, out_targets):
+        the pages linked to by page q are
+        `out_targets[out_indptr[q]:out_indptr[q + 1]]`.
+        """
+        if not hasattr(self, "out_targets"):
+            order = np.argsort(self.indices, kind="stable")
+            self.out_targets = self.rows[order]
+            self.out_indptr = np.zeros(len(self.pages) + 1, dtype=np.int64)
+            np.cumsum(self.out_degree, out=self.out_indptr[1:])
+        return self.out_indptr, self.out_targets
+
+    def to_dict(self, rank):
+        """
+        Returns a dictionary mapping page names to values of a vector.
+        """
+        return {page: float(rank[i]) for i, page in enumerate(self.pages)}
+
+    def save(self, path):
+        """
+        Writes the matrix to the directory `path`, which
+        MappedTransitionMatrix can read back without loading its links.
+        """
+        os.makedirs(path, exist_ok=True)
+        write_pages(path, self.pages)
+        np.save(os.path.join(path, GRAPH_INDPTR), self.indptr)
+        np.save(os.path.join(path, GRAPH_INDICES), self.indices)
+        np.save(os.path.join(path, GRAPH_OUT_DEGREE), self.out_degree)
+        np.save(os.path.join(path, GRAPH_OUT_TARGETS), self.outgoing()[1])
+
+
+class MappedTransitionMatrix(TransitionMatrix):
+    """
+    TransitionMatrix whose links stay on disk, memory-mapped from a
+    directory written by TransitionMatrix.save or convert_edge_list.
+
+    Only per-page arrays are held in memory. Products stream over the
+    links in blocks of about `block_size`, so graphs with more links
+    than fit in memory can be ranked with the vector solvers, and the
+    memory-mapped out-links serve the random surfers of walk_pagerank
+    and push_pagerank.
+    """
+
+    def __init__(self, path, block_size=MAPPED_BLOCK_SIZE):
+        self.path = path
+        with open(os.path.join(path, GRAPH_PAGES)) as f:
+            self.pages = f.read().splitlines()
+        self.index = {page: i for i, page in enumerate(self.pages)}
+        self.indptr = np.load(os.path.join(path, GRAPH_INDPTR))
+        self.indices = np.load(os.path.join(path, GRAPH_INDICES),
+                               mmap_mode="r")
+        self.out_degree = np.load(os.path.join(path, GRAPH_OUT_DEGREE))
+        self.dangling = self.out_degree == 0
+
+        # Split the rows into blocks of about block_size links each
+        starts = np.searchsorted(self.indptr,
+                                 np.arange(0, self.indptr[-1], block_size),
+                                 side="right") - 1
+        self.blocks = np.unique(np.append(starts, len(self.pages)))
+
+    def multiply(self, rank):
+        """
+        Returns, for each page, the sum over pages q linking to it
+        of rank[q] divided by the number of links on q, reading the
+        links from disk one block at a time.
+        """
+        degree = np.maximum(self.out_degree, 1)
+        if rank.ndim == 1:
+            share = np.where(self.dangling, 0, rank / degree)
+        else:
+            share = np.where(self.dangling[:, np.newaxis], 0,
+                             rank / degree[:, np.newaxis])
+        result = np.zeros_like(rank)
+        for start, end in zip(self.blocks[:-1], self.blocks[1:]):
+            sources = self.indices[self.indptr[start]:self.indptr[end]]
+            rows = np.repeat(np.arange(end - start),
+                             np.diff(self.indptr[start:end + 1]))
+            shares = share[sources]
+            if rank.ndim == 1:
+                result[start:end] = np.bincount(rows, weights=shares,
+                                                minlength=end - start)
+            else:
+                for column in range(rank.shape[1]):
+                    result[start:end, column] = np.bincount(
+                        rows, weights=shares[:, column],
+                        minlength=end - start
+                    )
+        return result
+
+    def outgoing(self):
+        """
+        Returns the outgoing links as CSR arrays (out_indptr, out_targets),
+        with out_targets memory-mapped from disk.
+        """
+        if not hasattr(self, "out_targets"):
+            self.out_targets = np.load(
+                os.path.join(self.path, GRAPH_OUT_TARGETS), mmap_mode="r"
+            )
+            self.out_indptr = np.zeros(len(self.pages) + 1, dtype=np.int64)
+            np.cumsum(self.out_degree, out=self.out_indptr[1:])
+        return self.out_indptr, self.out_targets
+
+
+def write_pages(path, pages):
+    """
+    Writes the page name table of a graph stored in directory `path`.
+    """
+    with open(os.path.join(path, GRAPH_PAGES), "w") as f:
+        for page in pages:
+            f.write(page + "\n")
+
+
+def read_edge_list(edge_path):
+    """
+    Yields (source, target) page name pairs from a text file with one
+    link per line, skipping blank lines and lines starting with "#".
+    """
+    with open(edge_path) as f:
+        for line in f:
+            fields = line.split()
+            if fields and not fields[0].startswith("#"):
+                yield fields[0], fields[1]
+
+
+def convert_edge_list(edge_path, path, block_size=MAPPED_BLOCK_SIZE):
+    """
+    Converts an edge list file, as read by `read_edge_list`, into a
+    graph stored in directory `path`, and returns it as a
+    MappedTransitionMatrix.
+
+    The file is read twice: once to number the pages and count their
+    links, and once to place each link in its rows of the memory-mapped
+    in-link and out-link CSR arrays, `block_size` links at a time. Only per-page data is
+    held in memory. Repeated links count as several links.
+    """
+    index = dict()
+    in_degree = []
+    out_degree = []
+    for source, target in read_edge_list(edge_path):
+        for page in (source, target):
+            if page not in index:
+                index[page] = len(index)
+                in_degree.append(0)
+                out_degree.append(0)
+        out_degree[index[source]] += 1
+        in_degree[index[target]] += 1
+
+    os.makedirs(path, exist_ok=True)
+    write_pages(path, index)
+    indptr = np.zeros(len(index) + 1, dtype=np.int64)
+    np.cumsum(in_degree, out=indptr[1:])
+    out_indptr = np.zeros(len(index) + 1, dtype=np.int64)
+    np.cumsum(out_degree, out=out_indptr[1:])
+    np.save(os.path.join(path, GRAPH_INDPTR), indptr)
+    np.save(os.path.join(path, GRAPH_OUT_DEGREE),
+            np.array(out_degree, dtype=np.int64))
+    indices = np.lib.format.open_memmap(
+        os.path.join(path, GRAPH_INDICES), mode="w+",
+        dtype=np.int64, shape=(int(indptr[-1]),)
+    )
+    out_targets = np.lib.format.open_memmap(
+        os.path.join(path, GRAPH_OUT_TARGETS), mode="w+",
+        dtype=np.int64, shape=(int(out_indptr[-1]),)
+    )
+
+    # Next free position in each row of the in-link and out-link arrays
+    cursor = indptr[:-1].copy()
+    out_cursor = out_indptr[:-1].copy()
+
+    def place(array, cursor, rows, values):
+        order = np.argsort(rows, kind="stable")
+        rows = rows[order]
+
+        # Offset of each link among the block's links in its row
+        starts = np.flatnonzero(np.diff(rows, prepend=-1))
+        offsets = np.arange(len(rows)) - np.repeat(
+            starts, np.diff(np.append(starts, len(rows)))
+        )
+        array[cursor[rows] + offsets] = values[order]
+        cursor[:] += np.bincount(rows, minlength=len(cursor))
+
+    def place_block(sources, targets):
+        sources = np.array(sources, dtype=np.int64)
+        targets = np.array(targets, dtype=np.int64)
+        place(indices, cursor, targets, sources)
+        place(out_targets, out_cursor, sources, targets)
+
+    sources = []
+    targets = []
+    for source, target in read_edge_list(edge_path):
+        sources.append(index[source])
+        targets.append(index[target])
+        if len(sources) == block_size:
+            place_block(sources, targets)
+            sources = []
+            targets = []
+    if sources:
+        place_block(sources, targets)
+    indices.flush()
+    out_targets.flush()
+    del indices, out_targets
+
+    return MappedTransitionMatrix(path)
+
+
+def walk_pagerank(matrix, damping_factor, n, walkers=1000, seed=None):
+    """
+    Return the PageRank vector of a TransitionMatrix estimated from
+    about `n` samples, taken by advancing `walkers` independent random
+    surfers together.
+
+    On each step, every surfer on a page with links follows a uniformly
+    chosen link with probability `damping_factor`, and otherwise jumps
+    to a uniformly chosen page, as do surfers on dangling pages. Surfers
+    start uniformly and first take `mixing_steps` uncounted steps, so
+    that their starting pages do not bias the estimate; visits are then
+    counted after every step. The same seed gives the same result.
+    """
+    rng = np.random.default_rng(seed)
+    walkers = max(1, min(walkers, n))
+    steps = max(1, -(-n // walkers))
+    positions = rng.integers(len(matrix), size=walkers)
+    _, positions = advance_walkers(matrix, damping_factor, positions,
+                                   mixing_steps(damping_factor), rng)
+    counts, _ = advance_walkers(matrix, damping_factor, positions, steps, rng)
+    return counts / counts.sum()
+
+
+def mixing_steps(damping_factor):
+    """
+    Return the number of steps after which the probability that a
+    surfer has followed links all the way from its starting page, never
+    jumping, falls below 1%.
+    """
+    if 0 < damping_factor < 1:
+        return math.ceil(math.log(0.01) / math.log(damping_factor))
+    return 1
+
+
+def advance_walkers(matrix, damping_factor, positions, steps, rng):
+    """
+    Advances random surfers at `positions` by `steps` steps, drawing
+    from the numpy Generator `rng`, as described in walk_pagerank.
+    Return (counts, positions): the number of visits to each page and
+    the surfers' final pages.
+    """
+    pages = len(matrix)
+    out_indptr, out_targets = matrix.outgoing()
+    walkers = len(positions)
+
+    counts = np.zeros(pages, dtype=np.int64)
+    visits = []
+    buffered = 0
+    for _ in range(steps):
+        degree = matrix.out_degree[positions]
+        follow = (rng.random(walkers) < damping_factor) & (degree > 0)
+
+        # Follow a uniformly chosen link, or teleport anywhere
+        offsets = (rng.random(walkers) * degree).astype(np.int64)
+        next_positions = rng.integers(pages, size=walkers)
+        next_positions[follow] = out_targets[
+            out_indptr[positions[follow]] + offsets[follow]
+        ]
+        positions = next_positions
+
+        # Count visits in batches to avoid a full bincount every step
+        visits.append(positions)
+        buffered += walkers
+        if buffered >= pages:
+            counts += np.bincount(np.concatenate(visits), minlength=pages)
+            visits = []
+            buffered = 0
+    if visits:
+        counts += np.bincount(np.concatenate(visits), minlength=pages)
+
+    return counts, positions
+
+
+def vectorized_sample_pagerank(corpus, damping_factor, n, walkers=1000,
+                               seed=None):
+    """
+    Return PageRank values for each page by sampling about `n` pages
+    with many random surfers advanced at once.
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    matrix = TransitionMatrix.from_corpus(corpus)
+    return matrix.to_dict(
+        walk_pagerank(matrix, damping_factor, n, walkers, seed)
+    )
+
+
+def start_sampler(matrix, damping_factor, steps):
+    """
+    Stores the matrix and batch parameters in a worker process.
+    """
+    global sampler
+    sampler = (matrix, damping_factor, steps)
+
+
+def sample_batch(stream):
+    """
+    Advances one sampling stream, a (positions, rng) pair, by a batch.
+    Return (counts, stream) with the batch's visit counts.
+    """
+    matrix, damping_factor, steps = sampler
+    positions, rng = stream
+    counts, positions = advance_walkers(matrix, damping_factor, positions,
+                                        steps, rng)
+    return counts, (positions, rng)
+
+
+def parallel_sample_pagerank(corpus, damping_factor, error=0.001,
+                             confidence=0.95, walkers=1000, processes=None,
+                             seed=None, min_batches=20, max_samples=10 ** 8):
+    """
+    Return PageRank values for each page by sampling with random surfers
+    spread over worker processes, stopping once every value is within
+    `error` of the true PageRank at the given `confidence`.
+
+    Each process advances `walkers` surfers with its own random stream,
+    spawned from `seed`, and reports their visits in batches. Batches
+    last long enough for a surfer to forget where it was, so each
+    batch's visit frequencies are taken as an independent estimate, and
+    a normal confidence interval is built around their mean. Sampling
+    stops once every interval reaches no further than `error` from the
+    mean and at least `min_batches` batches were taken, or after
+    `max_samples` samples. The same seed and number of processes give
+    the same result.
+
+    Return (ranks, intervals, samples): a dictionary mapping page names
+    to estimated PageRank values, a dictionary mapping them to (low,
+    high) confidence intervals, and the number of samples taken.
+    """
+    if error <= 0:
+        raise ValueError("error must be positive")
+    if max_samples <= 0:
+        raise ValueError("max_samples must be positive")
+    matrix = TransitionMatrix.from_corpus(corpus)
+    n = len(matrix)
+    processes = processes or os.cpu_count() or 1
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+
+    steps = mixing_steps(damping_factor)
+    batch_samples = walkers * steps
+
+    streams = [
+        (rng.integers(n, size=walkers), rng)
+        for rng in map(np.random.default_rng,
+                       np.random.SeedSequence(seed).spawn(processes))
+    ]
+    total = np.zeros(n)
+    squares = np.zeros(n)
+    batches = 0
+    half_width = np.full(n, np.inf)
+    with ProcessPoolExecutor(processes, initializer=start_sampler,
+                             initargs=(matrix, damping_factor, steps)) as pool:
+
+        # Discard a first batch so surfers no longer start uniformly
+        streams = [stream for _, stream in pool.map(sample_batch, streams)]
+        while batches * batch_samples < max_samples:
+            results = list(pool.map(sample_batch, streams))
+            streams = [stream for _, stream in results]
+            for counts, _ in results:
+                frequencies = counts / batch_samples
+                total += frequencies
+                squares += frequencies ** 2
+                batches += 1
+
+            # Half-width of each page's interval from the batch variance
+            mean = total / batches
+            if batches > 1:
+                variance = np.maximum(squares / batches - mean ** 2, 0)
+                half_width = z * np.sqrt(variance / (batches - 1))
+            if batches >= min_batches and (half_width <= error).all():
+                break
+
+    ranks = matrix.to_dict(mean)
+    intervals = {
+        page: (float(mean[i] - half_width[i]), float(mean[i] + half_width[i]))
+        for i, page in enumerate(matrix.pages)
+    }
+    return ranks, intervals, batches * batch_samples
+
+
+def power_iteration(matrix, damping_factor, tolerance=1e-10,
+                    max_iterations=1000):
+    """
+    Return the PageRank vector of a TransitionMatrix by power iteration,
+    starting from the uniform vector and stopping once the L1 change
+    between iterations falls below `tolerance`.
+    """
+    return jacobi_pagerank(matrix, damping_factor, tolerance,
+                           max_iterations)[0]
+
+
+def jacobi_pagerank(matrix, damping_factor, tolerance=1e-10,
+                    max_iterations=1000):
+    """
+    Solve by power iteration, updating every page from the previous
+    iteration's values. Return (rank, iterations).
+    """
+    n = len(matrix)
+    rank = np.full(n, 1 / n)
+    iterations = 0
+    while iterations < max_iterations:
+        iterations += 1
+        next_rank = matrix.step(rank, damping_factor)
+        error = np.abs(next_rank - rank).sum()
+        rank = next_rank
+        if error < tolerance:
+            break
+    return rank, iterations
+
+
+def gauss_seidel_pagerank(matrix, damping_factor, tolerance=1e-10,
+                          max_iterations=1000):
+    """
+    Solve by Gauss-Seidel sweeps, updating pages in order and using
+    each new value as soon as it is computed. Return (rank, iterations).
+
+    Sweeps run in Python, one page at a time, so each costs more than
+    a vectorized power iteration step, but far fewer are needed. The
+    links are loaded into memory, so a MappedTransitionMatrix is
+    rejected.
+    """
+    if isinstance(matrix, MappedTransitionMatrix):
+        raise TypeError("gauss-seidel needs the links in memory, "
+                        "use jacobi or extrapolation for a mapped graph")
+    n = len(matrix)
+    rank = [1 / n] * n
+    degree = matrix.out_degree.tolist()
+    dangling = matrix.dangling.tolist()
+    indptr = matrix.indptr.tolist()
+    indices = matrix.indices.tolist()
+    share = [rank[q] / degree[q] if degree[q] else 0 for q in range(n)]
+    dangling_rank = sum(rank[q] for q in range(n) if dangling[q])
+    base = (1 - damping_factor) / n
+
+    iterations = 0
+    while iterations < max_iterations:
+        iterations += 1
+        previous = rank[:]
+        for p in range(n):
+            links = sum(share[q] for q in indices[indptr[p]:indptr[p + 1]])
+            value = base + damping_factor * (links + dangling_rank / n)
+            if dangling[p]:
+                dangling_rank += value - rank[p]
+            else:
+                share[p] = value / degree[p]
+            rank[p] = value
+
+        # Renormalize, since sweeps do not conserve the total rank
+        total = sum(rank)
+        rank = [value / total for value in rank]
+        share = [value / total for value in share]
+        dangling_rank /= total
+        error = sum(abs(a - b) for a, b in zip(rank, previous))
+        if error < tolerance:
+            break
+
+    return np.array(rank), iterations
+
+
+def extrapolated_pagerank(matrix, damping_factor, tolerance=1e-10,
+                          max_iterations=1000, period=10):
+    """
+    Solve by power iteration with quadratic extrapolation every
+    `period` iterations, which estimates the limit from the last four
+    iterates by cancelling the next two slowest-decaying components
+    of the error. Return (rank, iterations).
+    """
+    n = len(matrix)
+    rank = np.full(n, 1 / n)
+    history = [rank]
+    iterations = 0
+    while iterations < max_iterations:
+        iterations += 1
+        next_rank = matrix.step(rank, damping_factor)
+        error = np.abs(next_rank - rank).sum()
+        rank = next_rank
+        if error < tolerance:
+            break
+
+        history = history[-3:] + [rank]
+        if iterations % period == 0 and len(history) == 4:
+            rank = quadratic_extrapolation(*history)
+            history = [rank]
+    return rank, iterations
+
+
+def quadratic_extrapolation(x0, x1, x2, x3):
+    """
+    Return the quadratic extrapolation of four successive power
+    iteration vectors, normalized to sum to 1.
+    """
+    y = np.column_stack((x1 - x0, x2 - x0))
+    gamma = np.linalg.lstsq(y, -(x3 - x0), rcond=None)[0]
+    beta0 = gamma[0] + gamma[1] + 1
+    beta1 = gamma[1] + 1
+    extrapolated = beta0 * x1 + beta1 * x2 + x3
+    total = extrapolated.sum()
+    if not np.isfinite(total) or total <= 0 or (extrapolated < 0).any():
+        return x3
+    return extrapolated / total
+
+
+def adaptive_pagerank(matrix, damping_factor, tolerance=1e-10,
+                      max_iterations=1000):
+    """
+    Solve by power iteration that stops recomputing pages once they
+    have converged, when their change has stayed below `tolerance` / N
+    for FREEZE_ITERATIONS iterations in a row. Return (rank, iterations).
+
+    Frozen pages keep passing their rank along their links; only the
+    links into active pages are summed on each iteration. Every
+    FULL_SWEEP_INTERVAL iterations, and whenever the active pages have
+    converged, every page is recomputed instead: pages that changed by
+    more than `tolerance` / N are made active again, and the solver
+    stops only once such a sweep changes the ranks by less than
+    `tolerance` in total. The links are loaded into memory, so a
+    MappedTransitionMatrix is rejected.
+    """
+    if isinstance(matrix, MappedTransitionMatrix):
+        raise TypeError("adaptive needs the links in memory, "
+                        "use jacobi or extrapolation for a mapped graph")
+    n = len(matrix)
+    rank = np.full(n, 1 / n)
+    all_rows = np.repeat(np.arange(n), np.diff(matrix.indptr))
+    degree = np.maximum(matrix.out_degree, 1)
+    threshold = tolerance / n
+    streak = np.zeros(n, dtype=np.int64)
+
+    active = np.arange(n)
+    rows = all_rows
+    sources = matrix.indices
+    iterations = 0
+    sweep = False
+    while iterations < max_iterations:
+        iterations += 1
+        sweep = sweep or iterations % FULL_SWEEP_INTERVAL == 0
+        if sweep:
+            active = np.arange(n)
+            rows = all_rows
+            sources = matrix.indices
+
+        share = np.where(matrix.dangling, 0, rank / degree)
+        dangling_rank = rank[matrix.dangling].sum()
+        links = np.bincount(rows, weights=share[sources],
+                            minlength=len(active))
+        values = ((1 - damping_factor) / n
+                  + damping_factor * (links + dangling_rank / n))
+        change = np.abs(values - rank[active])
+        rank[active] = values
+        if sweep and change.sum() < tolerance:
+            break
+
+        # Count how long each page has converged, so pages that moved
+        # in a sweep start over
+        small = change < threshold
+        streak[active] = np.where(small, streak[active] + 1, 0)
+
+        # Check every page next time if the active ones have converged
+        sweep = not sweep and change.sum() < tolerance
+
+        # Drop converged pages and the links into them, once there are
+        # enough of them to repay filtering the links
+        converged = streak[active] >= FREEZE_ITERATIONS
+        if 4 * converged.sum() >= len(active):
+            position = np.cumsum(~converged) - 1
+            keep = ~converged[rows]
+            rows = position[rows[keep]]
+            sources = sources[keep]
+            active = active[~converged]
+
+    return rank / rank.sum(), iterations
+
+
+# PageRank solvers: each maps (matrix, damping_factor, tolerance,
+# max_iterations) to (rank vector, iterations)
+SOLVERS = {
+    "jacobi": jacobi_pagerank,
+    "gauss-seidel": gauss_seidel_pagerank,
+    "extrapolation": extrapolated_pagerank,
+    "adaptive": adaptive_pagerank,
+}
+
+
+def teleport_matrix(matrix, seed_sets):
+    """
+    Returns an N x B matrix with one teleport distribution per column.
+
+    Each seed set is either an iterable of page names, teleported to
+    uniformly, or a dictionary mapping page names to weights.
+    """
+    teleports = np.zeros((len(matrix), len(seed_sets)))
+    for column, seeds in enumerate(seed_sets):
+        if not isinstance(seeds, dict):
+            seeds = {page: 1 for page in seeds}
+        for page, weight in seeds.items():
+            teleports[matrix.index[page], column] += weight
+        total = teleports[:, column].sum()
+        if total <= 0:
+            raise ValueError("seed set must have positive weight")
+        teleports[:, column] /= total
+    return teleports
+
+
+def personalized_power_iteration(matrix, teleports, damping_factor,
+                                 tolerance=1e-10, max_iterations=1000):
+    """
+    Return personalized PageRank vectors for a batch of teleport
+    distributions, given as the columns of an N x B matrix, solved
+    together by power iteration over the shared transition matrix.
+
+    Surfers teleport, and leave dangling pages, according to their
+    column's distribution. Iteration stops once every column's L1
+    change falls below `tolerance`.
+    """
+    rank = teleports.copy()
+    for _ in range(max_iterations):
+        dangling_rank = rank[matrix.dangling].sum(axis=0)
+        next_rank = ((1 - damping_factor) * teleports
+                     + damping_factor * (matrix.multiply(rank)
+                                         + dangling_rank * teleports))
+        error = np.abs(next_rank - rank).sum(axis=0).max()
+        rank = next_rank
+        if error < tolerance:
+            break
+    return rank
+
+
+def personalized_pagerank(corpus, seed_sets, damping_factor,
+                          tolerance=1e-10):
+    """
+    Return personalized PageRank values for each of several seed sets.
+
+    Return a list with one dictionary per seed set, mapping page names
+    to their PageRank value when surfers teleport only to that set.
+    """
+    matrix = TransitionMatrix.from_corpus(corpus)
+    ranks = personalized_power_iteration(
+        matrix, teleport_matrix(matrix, seed_sets), damping_factor, tolerance
+    )
+    return [matrix.to_dict(ranks[:, column])
+            for column in range(ranks.shape[1])]
+
+
+def push_pagerank(matrix, seed, damping_factor, epsilon=1e-7):
+    """
+    Return an approximate personalized PageRank for a single seed page
+    by local residual pushes, touching only pages near the seed.
+
+    Every page holds an estimate and a residual, starting with all
+    residual on the seed. A page whose residual exceeds `epsilon` times
+    its number of links keeps (1 - damping_factor) of it as estimate and
+    pushes the rest along its links; a dangling page pushes it back to
+    the seed. Return a dictionary of the pages with nonzero estimates;
+    the estimates sum to 1 minus the residual left unpushed.
+    """
+    out_indptr, out_targets = matrix.outgoing()
+    source = matrix.index[seed]
+    estimate = dict()
+    residual = {source: 1.0}
+    queue = [source]
+    while queue:
+        page = queue.pop()
+        mass = residual.get(page, 0)
+        degree = int(matrix.out_degree[page])
+        if mass <= epsilon * max(degree, 1):
+            continue
+        residual[page] = 0
+        estimate[page] = estimate.get(page, 0) + (1 - damping_factor) * mass
+
+        if degree:
+            targets = out_targets[out_indptr[page]:out_indptr[page + 1]]
+            share = damping_factor * mass / degree
+        else:
+            targets = [source]
+            share = damping_factor * mass
+        for target in targets:
+            target = int(target)
+            residual[target] = residual.get(target, 0) + share
+            threshold = epsilon * max(int(matrix.out_degree[target]), 1)
+            if residual[target] > threshold:
+                queue.append(target)
+
+    return {matrix.pages[page]: value for page, value in estimate.items()}
+
+
+def sparse_pagerank(corpus, damping_factor, tolerance=1e-10):
+    """
+    Return PageRank values for each page by vectorized power iteration
+    over a sparse transition matrix.
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    matrix = TransitionMatrix.from_corpus(corpus)
+    return matrix.to_dict(power_iteration(matrix, damping_factor, tolerance))
+
+
+def mapped_pagerank(path, damping_factor, tolerance=1e-10):
+    """
+    Return PageRank values for each page of a graph stored in directory
+    `path`, by power iteration streaming over its links on disk.
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    matrix = MappedTransitionMatrix(path)
+    return matrix.to_dict(power_iteration(matrix, damping_factor, tolerance))
+
+
+def update_pagerank(corpus, ranks, damping_factor, added=(), removed=(),
+                    tolerance=1e-10):
+    """
+    Return PageRank values after adding and removing links, starting
+    from `ranks`, the converged PageRank values before the change.
+
+    `added` and `removed` are iterables of (source, target) page pairs;
+    `corpus` is updated in place, gaining any new pages. Only the
+    residual caused by the change is computed, at the old targets and
+    new targets of each edited page, and it is pushed along links until
+    no page holds more than `tolerance` / N. Residual spread evenly over
+    every page, from dangling pages or a change in corpus size, only
+    rescales the solution, so it is dropped and the result normalized.
+
+    Return (ranks, report), where report counts the pushes and link
+    traversals made and compares them with the work of recomputing by
+    power iteration from the uniform vector to the same tolerance.
+    """
+    old_links = dict()
+    for source, target in removed:
+        old_links.setdefault(source, set(corpus[source]))
+        corpus[source].discard(target)
+    for source, target in added:
+        for page in (source, target):
+            corpus.setdefault(page, set())
+        old_links.setdefault(source, set(corpus[source]))
+        if source != target:
+            corpus[source].add(target)
+
+    rank = dict(ranks)
+    residual = dict()
+    new_pages = [page for page in corpus if page not in rank]
+    if new_pages:
+
+        # A new page lacks the teleport and dangling share that every
+        # old page received, which the old dangling pages determine
+        dangling = sum(rank[page] for page in rank
+                       if not old_links.get(page, corpus[page]))
+        share = ((1 - damping_factor) + damping_factor * dangling) / len(rank)
+        for page in new_pages:
+            rank[page] = 0
+            residual[page] = share
+
+    # Residual from moving each edited page's rank to its new links
+    for source, old in old_links.items():
+        new = corpus[source]
+        if old == new:
+            continue
+        mass = damping_factor * rank[source]
+        for links, sign in ((old, -1), (new, 1)):
+            for target in links:
+                residual[target] = (residual.get(target, 0)
+                                    + sign * mass / len(links))
+
+    epsilon = tolerance / len(corpus)
+    queue = deque(page for page, value in residual.items()
+                  if abs(value) > epsilon)
+    queued = set(queue)
+    touched = set(queue)
+    pushes = 0
+    traversals = 0
+    while queue:
+        page = queue.popleft()
+        queued.discard(page)
+        mass = residual[page]
+        residual[page] = 0
+        rank[page] += mass
+        pushes += 1
+
+        links = corpus[page]
+        traversals += max(len(links), 1)
+        for target in links:
+            residual[target] = (residual.get(target, 0)
+                                + damping_factor * mass / len(links))
+            if abs(residual[target]) > epsilon and target not in queued:
+                touched.add(target)
+                queued.add(target)
+                queue.append(target)
+
+    total = sum(rank.values())
+    for page in rank:
+        rank[page] /= total
+
+    # Power iteration shrinks the L1 error by damping_factor per step
+    links = sum(len(links) for links in corpus.values())
+    iterations = math.ceil(math.log(tolerance) / math.log(damping_factor))
+    full = iterations * (links + len(corpus))
+    report = {
+        "pushes": pushes,
+        "pages_touched": len(touched),
+        "traversals": traversals,
+        "full_iterations": iterations,
+        "full_traversals": full,
+        "work_saved": 1 - traversals / full,
+    }
+    return rank, report
+
+
 if __name__ == "__main__":
     main()